@@ -0,0 +1,135 @@
+"""Micro-benchmark for chat follow-up selection.
+
+Compares the compiled ChatRuleEngine with the original chain of
+`any(word in message.lower() ...)` scans, after checking both pick the same
+follow-ups, then with a synthetic rule set of growing size evaluated the
+old way (one any() scan per rule), and finally the engine's two keyword
+strategies against each other to place REGEX_MIN_KEYWORDS. Run from the
+backend directory:
+
+    python benchmarks/bench_chat_rules.py
+"""
+import json
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chat_rules import DEFAULT_RULES_PATH, REGEX_MIN_KEYWORDS, ChatRuleEngine  # noqa: E402
+
+MESSAGES = [
+    "hi",
+    "What should I do with my career? I like technology and data.",
+    "I want to learn new skills for a software job",
+    "Can you build me a roadmap with clear steps and a study path?",
+    "Tell me more about nursing and how long it takes to become a registered nurse " * 4,
+    "explain the training path for AI engineers",
+]
+
+
+def legacy_select(message: str, user_message_count: int, message_count: int):
+    """The original inline selection logic, with questions rebuilt per call"""
+    mcq_question = None
+    if user_message_count == 1:
+        mcq_question = {"question": "What areas interest you the most?", "options": [
+            "Technology & Software", "Creative Arts & Design", "Business & Finance",
+            "Healthcare & Medicine", "Education & Teaching", "Engineering"], "type": "multiple"}
+    elif user_message_count == 3 and any(word in message.lower() for word in ['tech', 'software', 'data', 'ai', 'technology']):
+        mcq_question = {"question": "What's your current experience level?", "options": [
+            "Complete Beginner", "Some Basic Knowledge", "Intermediate (1-2 years)",
+            "Advanced (3+ years)"], "type": "single"}
+    elif user_message_count >= 5 and any(word in message.lower() for word in ['roadmap', 'learn', 'study', 'path']):
+        mcq_question = {"question": "How much time can you dedicate to learning per week?", "options": [
+            "1-5 hours", "5-10 hours", "10-20 hours", "20+ hours (Full-time)"], "type": "single"}
+    elif user_message_count == 2 and any(word in message.lower() for word in ['skill', 'learn']):
+        mcq_question = {"question": "Which skills would you like to focus on?", "options": [
+            "Technical/Hard Skills", "Soft Skills (Communication, Leadership)",
+            "Industry-Specific Knowledge", "Project Management", "All of the above"], "type": "multiple"}
+
+    suggested_options = []
+    if message_count <= 2 and not mcq_question:
+        message_lower = message.lower()
+        if any(word in message_lower for word in ['career', 'job', 'profession', 'what should i']):
+            suggested_options = ["Tell me about tech careers", "Show creative career paths", "Explore business careers"]
+        elif any(word in message_lower for word in ['skill', 'learn', 'study']):
+            suggested_options = ["Create a learning roadmap", "What skills are in-demand?", "How long does it take?"]
+        elif any(word in message_lower for word in ['roadmap', 'path', 'steps']):
+            suggested_options = ["Generate a detailed roadmap", "Show me example projects", "Recommend learning resources"]
+        else:
+            suggested_options = ["Explore career options", "Build a skills roadmap", "Ask about specific careers"]
+    return mcq_question, suggested_options
+
+
+def scaled_config(extra_rules: int, seed: int = 7) -> dict:
+    """The shipped rules plus `extra_rules` synthetic suggestion rules of five keywords each"""
+    rng = random.Random(seed)
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    rules = config["suggestions"]["rules"]
+    for n in range(extra_rules):
+        keywords = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 9))) for _ in range(5)]
+        rules.insert(len(rules) - 1, {"name": f"extra{n}", "keywords": keywords, "options": [f"option {n}"]})
+    return config
+
+
+def any_chain_select(config: dict):
+    """Old-style evaluation of a suggestion config: one any() scan per rule"""
+    rules = [(rule["keywords"], rule["options"]) for rule in config["suggestions"]["rules"]]
+    default = config["suggestions"]["default"]
+
+    def select(message: str):
+        for keywords, options in rules:
+            if any(word in message.lower() for word in keywords):
+                return options
+        return default
+    return select
+
+
+def per_message_us(fn, cases, number=20000) -> float:
+    rounds = max(1, number // len(cases))
+    elapsed = timeit.timeit(lambda: [fn(*case) for case in cases], number=rounds)
+    return elapsed / (rounds * len(cases)) * 1e6
+
+
+def main():
+    engine = ChatRuleEngine.from_file()
+    cases = [(m, turns, count) for m in MESSAGES for turns, count in ((1, 1), (2, 2), (2, 3), (3, 5), (6, 11))]
+
+    for message, turns, count in cases:
+        mcq, options = engine.select(message, turns, count)
+        assert (mcq, list(options)) == legacy_select(message, turns, count), (message, turns, count)
+
+    print("shipped rules, mixed turns")
+    for name, fn in (("legacy", legacy_select), ("engine", engine.select)):
+        print(f"{name:>10}: {per_message_us(fn, cases):.2f} us/message")
+
+    # Suggestion turn (first message), no MCQ: every rule has to be checked
+    print("suggestion turn, growing rule set")
+    for extra in (0, 20, 100, 400):
+        config = scaled_config(extra)
+        scaled = ChatRuleEngine(config)
+        chain = any_chain_select(config)
+        for message in MESSAGES:
+            assert list(scaled.select(message, 0, 1)[1]) == chain(message), message
+        keywords = sum(len(rule["keywords"]) for rule in config["suggestions"]["rules"])
+        chain_us = per_message_us(chain, [(m,) for m in MESSAGES])
+        engine_us = per_message_us(lambda m: scaled.select(m, 0, 1), [(m,) for m in MESSAGES])
+        print(f"{keywords:>5} keywords: any-chain {chain_us:8.2f} us, engine {engine_us:6.2f} us")
+
+    # Where the engine should switch from rule-by-rule checks to the regex scan
+    print(f"suggestion turn, forced strategy (engine switches at {REGEX_MIN_KEYWORDS} keywords)")
+    for extra in (0, 4, 8, 12, 16, 24):
+        config = scaled_config(extra)
+        linear = ChatRuleEngine(config, regex_min_keywords=float("inf"))
+        regex = ChatRuleEngine(config, regex_min_keywords=0)
+        keywords = sum(len(rule["keywords"]) for rule in config["suggestions"]["rules"])
+        linear_us = per_message_us(lambda m: linear.select(m, 0, 1), [(m,) for m in MESSAGES])
+        regex_us = per_message_us(lambda m: regex.select(m, 0, 1), [(m,) for m in MESSAGES])
+        print(f"{keywords:>5} keywords: rule-by-rule {linear_us:6.2f} us, regex {regex_us:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
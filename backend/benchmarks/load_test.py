@@ -0,0 +1,363 @@
+"""Local load test for the API.
+
+Boots the app in this process, either behind httpx's ASGI transport or
+under uvicorn on a local port, with the fake LLM (LLM_BACKEND=fake) and a
+throwaway database. Users, sessions, chat histories and roadmaps are seeded
+directly, then each scenario is driven by `--concurrency` workers for
+`--duration` seconds and reported as throughput and p50/p95/p99 latency.
+
+Run from the backend directory:
+
+    python benchmarks/load_test.py                       # in-memory Mongo, ASGI transport
+    python benchmarks/load_test.py --mongo mongodb://localhost:27017 --server uvicorn
+    python benchmarks/load_test.py --scenarios chat,history --llm-latency 0.2
+
+The in-memory store needs `pip install mongomock-motor`; its timings say
+nothing about real query cost, so use a local mongod for numbers that
+matter. Against a real server a fresh `bench_<random>` database is created
+and dropped afterwards.
+
+`--save-baseline FILE` stores the results; `--baseline FILE` compares a run
+against them and exits with status 1 when a scenario's p95 or p99 grows, or
+its throughput drops, by more than `--tolerance`. Baselines are only
+meaningful on the machine and with the options they were recorded with, so
+none is checked in.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+MESSAGES = [
+    "What should I do with my career? I like technology and data.",
+    "I want to learn new skills for a software job",
+    "Can you build me a roadmap with clear steps?",
+    "How long does it take to become a registered nurse?",
+    "Which skills matter most for a product manager?",
+]
+
+PROFILES = [
+    {"interests": ["technology", "data"], "skills": ["python", "sql"], "experience_level": "beginner"},
+    {"interests": ["design", "art"], "skills": ["figma"], "experience_level": "intermediate"},
+    {"interests": ["healthcare"], "skills": ["communication", "biology"], "experience_level": "beginner"},
+    {"interests": ["business", "finance"], "skills": ["excel", "analysis"], "experience_level": "advanced"},
+]
+
+
+class Session(NamedTuple):
+    user_id: str
+    headers: Dict[str, str]
+    conversation_ids: List[str]
+    roadmap_ids: List[str]
+
+
+class Scenario(NamedTuple):
+    method: str
+    # (session, rng) -> (path, json body or None)
+    build: Callable[[Session, random.Random], tuple]
+    stream: bool = False
+
+
+SCENARIOS = {
+    "profile": Scenario("GET", lambda s, rng: ("/api/user/profile", None)),
+    "me": Scenario("GET", lambda s, rng: ("/api/auth/me", None)),
+    "conversations": Scenario("GET", lambda s, rng: ("/api/chat/history", None)),
+    "history": Scenario("GET", lambda s, rng: (
+        f"/api/chat/history?conversation_id={rng.choice(s.conversation_ids)}&limit=50", None)),
+    "explore": Scenario("GET", lambda s, rng: (
+        f"/api/careers/explore?limit=20&offset={rng.randrange(0, 40)}", None)),
+    "recommend": Scenario("POST", lambda s, rng: ("/api/careers/recommend", rng.choice(PROFILES))),
+    "roadmaps": Scenario("GET", lambda s, rng: ("/api/roadmap/list", None)),
+    "roadmap": Scenario("GET", lambda s, rng: (f"/api/roadmap/{rng.choice(s.roadmap_ids)}", None)),
+    "chat": Scenario("POST", lambda s, rng: ("/api/chat/send", {
+        "message": rng.choice(MESSAGES), "conversation_id": rng.choice(s.conversation_ids)})),
+    "stream": Scenario("POST", lambda s, rng: ("/api/chat/stream", {
+        "message": rng.choice(MESSAGES), "conversation_id": rng.choice(s.conversation_ids)}), stream=True),
+}
+
+DEFAULT_SCENARIOS = "profile,conversations,history,explore,recommend,roadmaps,roadmap,chat,stream"
+
+
+def configure_environment(args):
+    """Environment for server.py; must run before it is imported"""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_FIRST_TOKEN_DELAY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_CHUNK_DELAY"] = str(args.llm_chunk_delay)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ["MONGO_URL"] = "mongodb://localhost:27017" if args.mongo == "memory" else args.mongo
+    os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+    # The load comes from a handful of users; keep the limiter out of the measurement
+    os.environ["RATE_LIMITS"] = "chat=1000000/1,roadmap=1000000/1,explain=1000000/1"
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+    os.environ.pop("TRACE_OTLP_ENDPOINT", None)
+    os.environ.pop("TRACE_JSONL_PATH", None)
+    if args.mongo == "memory":
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--mongo memory needs mongomock-motor (pip install mongomock-motor), "
+                     "or pass a local MongoDB URL")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *a, **kw: mongomock_motor.AsyncMongoMockClient()
+
+
+async def seed(db, args, rng: random.Random) -> List[Session]:
+    """Users with sessions, conversations of `--history` messages and a few roadmaps each"""
+    from conversations import message_preview
+    from roadmaps import derive_roadmap_fields
+
+    now = datetime.now(timezone.utc)
+    roadmap_content = "\n\n".join(
+        f"Step {n}: Phase {n}\nDuration: {n + 1} weeks\nWork through phase {n}.\n• Skill {n}a\n• Skill {n}b"
+        for n in range(1, 6)
+    )
+    roadmap_fields = derive_roadmap_fields(roadmap_content)
+    sessions = []
+    users, session_docs, messages, conversations, roadmaps, stats = [], [], [], [], [], []
+    for u in range(args.users):
+        user_id = f"user_bench{u:06d}"
+        token = f"bench_token_{u:06d}_{uuid.uuid4().hex[:8]}"
+        users.append({"user_id": user_id, "email": f"{user_id}@bench.local", "name": f"Bench User {u}",
+                      "picture": None, "created_at": now.isoformat()})
+        session_docs.append({"user_id": user_id, "session_token": token,
+                             "expires_at": now + timedelta(days=1), "created_at": now})
+        conversation_ids = []
+        for c in range(args.conversations):
+            conversation_id = f"conv_bench{u:06d}{c:03d}"
+            conversation_ids.append(conversation_id)
+            started = now - timedelta(days=1)
+            last = None
+            for m in range(args.history):
+                last = {
+                    "message_id": f"msg_{uuid.uuid4().hex[:12]}",
+                    "user_id": user_id,
+                    "conversation_id": conversation_id,
+                    "role": "user" if m % 2 == 0 else "assistant",
+                    "content": rng.choice(MESSAGES) * (1 if m % 2 == 0 else 4),
+                    "timestamp": (started + timedelta(seconds=m)).isoformat(),
+                }
+                messages.append(last)
+            if last is not None:
+                conversations.append({
+                    "user_id": user_id, "conversation_id": conversation_id,
+                    "last_message": message_preview(last), "last_timestamp": last["timestamp"],
+                    "message_count": args.history, "user_turn_count": (args.history + 1) // 2,
+                    "created_at": started.isoformat(),
+                })
+        roadmap_ids = []
+        for r in range(args.roadmaps):
+            roadmap_id = f"roadmap_bench{u:06d}{r:03d}"
+            roadmap_ids.append(roadmap_id)
+            roadmaps.append({
+                "roadmap_id": roadmap_id, "user_id": user_id, "career_title": f"Career {r}",
+                "description": f"Learning path for Career {r}", "content": roadmap_content,
+                "experience_level": "beginner", "created_at": (now - timedelta(minutes=r)).isoformat(),
+                **roadmap_fields,
+            })
+        stats.append({"user_id": user_id, "total_chats": (args.history + 1) // 2 * args.conversations,
+                      "total_roadmaps": args.roadmaps})
+        sessions.append(Session(user_id, {"Authorization": f"Bearer {token}"}, conversation_ids, roadmap_ids))
+
+    for name, docs in (("users", users), ("user_sessions", session_docs), ("chat_messages", messages),
+                       ("conversations", conversations), ("roadmaps", roadmaps), ("user_stats", stats)):
+        for i in range(0, len(docs), 5000):
+            await db[name].insert_many(docs[i:i + 5000], ordered=False)
+    print(f"Seeded {len(users)} users, {len(messages)} messages in {len(conversations)} conversations, "
+          f"{len(roadmaps)} roadmaps")
+    return sessions
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(q * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, sessions: List[Session],
+                concurrency: int, duration: float, seed: int, record: bool = True) -> dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int):
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            session = rng.choice(sessions)
+            path, body = scenario.build(session, rng)
+            started = time.perf_counter()
+            try:
+                if scenario.stream:
+                    async with client.stream(scenario.method, path, json=body, headers=session.headers) as r:
+                        async for _ in r.aiter_raw():
+                            pass
+                else:
+                    r = await client.request(scenario.method, path, json=body, headers=session.headers)
+                status = r.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            elif record:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 2),
+    }
+
+
+def print_results(results: Dict[str, dict]):
+    print(f"\n{'scenario':<14}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['requests']:>9}{sum(r['errors'].values()):>8}{r['rps']:>9.1f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}")
+
+
+def compare(results: Dict[str, dict], baseline: dict, config: dict, tolerance: float) -> List[str]:
+    """Regressions against a stored baseline, as printable lines"""
+    mismatched = {k: (baseline["config"].get(k), v) for k, v in config.items() if baseline["config"].get(k) != v}
+    if mismatched:
+        print("\nWarning: baseline was recorded with different options: "
+              + ", ".join(f"{k} {old!r} -> {new!r}" for k, (old, new) in mismatched.items()))
+    regressions = []
+    print(f"\n{'scenario':<14}{'req/s':>16}{'p95 ms':>18}{'p99 ms':>18}")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<14}  (not in baseline)")
+            continue
+        cells = []
+        for key, higher_is_worse in (("rps", False), ("p95_ms", True), ("p99_ms", True)):
+            change = (r[key] - base[key]) / base[key] if base[key] else 0.0
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            cells.append(f"{base[key]:>7.1f}->{r[key]:<7.1f}{'!' if worse else ' '}")
+            if worse:
+                regressions.append(f"{name} {key}: {base[key]} -> {r[key]} ({change:+.0%})")
+        print(f"{name:<14}" + " ".join(cells))
+    return regressions
+
+
+async def run(args) -> int:
+    configure_environment(args)
+    import server
+
+    rng = random.Random(args.seed)
+    sessions = await seed(server.db, args, rng)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios {unknown}; choose from {sorted(SCENARIOS)}")
+
+    uvicorn_server = serve_task = None
+    if args.server == "uvicorn":
+        import uvicorn
+        uvicorn_server = uvicorn.Server(uvicorn.Config(
+            server.app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="on"
+        ))
+        serve_task = asyncio.ensure_future(uvicorn_server.serve())
+        while not uvicorn_server.started:
+            if serve_task.done():
+                serve_task.result()
+            await asyncio.sleep(0.05)
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency * 2))
+        base_url = f"http://127.0.0.1:{args.port}"
+    else:
+        # The ASGI transport does not run lifespan events
+        await server.app.router.startup()
+        transport = httpx.ASGITransport(app=server.app)
+        base_url = "http://bench.local"
+
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+            for name in scenarios:
+                if args.warmup:
+                    await drive(client, SCENARIOS[name], sessions, args.concurrency, args.warmup, args.seed,
+                                record=False)
+                results[name] = await drive(client, SCENARIOS[name], sessions, args.concurrency,
+                                            args.duration, args.seed)
+                if results[name]["errors"]:
+                    print(f"{name}: non-200 responses {results[name]['errors']}")
+    finally:
+        if uvicorn_server is not None:
+            uvicorn_server.should_exit = True
+            await serve_task
+        else:
+            await server.app.router.shutdown()
+        if args.mongo != "memory":
+            await server.client.drop_database(os.environ["DB_NAME"])
+
+    print_results(results)
+    config = {
+        "server": args.server, "mongo": "memory" if args.mongo == "memory" else "mongodb",
+        "users": args.users, "conversations": args.conversations, "history": args.history,
+        "roadmaps": args.roadmaps, "concurrency": args.concurrency, "duration": args.duration,
+        "llm_latency": args.llm_latency, "llm_chunk_delay": args.llm_chunk_delay,
+        "python": platform.python_version(), "machine": platform.node(),
+    }
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({
+            "recorded_at": datetime.now(timezone.utc).isoformat(), "config": config, "results": results
+        }, indent=2) + "\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), config, args.tolerance)
+        if regressions:
+            print("\nRegressions beyond {:.0%}:\n  ".format(args.tolerance) + "\n  ".join(regressions))
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi",
+                        help="call the app through httpx's ASGI transport or over HTTP under uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mongo", default="memory", help="MongoDB URL, or 'memory' for mongomock-motor")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help=f"comma separated, from {sorted(SCENARIOS)}")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--conversations", type=int, default=3, help="conversations per user")
+    parser.add_argument("--history", type=int, default=40, help="messages per conversation")
+    parser.add_argument("--roadmaps", type=int, default=3, help="roadmaps per user")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unrecorded seconds before each scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds to first token")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.01, help="fake LLM seconds between chunks")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="write this run's results here")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative change before failing")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
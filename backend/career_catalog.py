@@ -0,0 +1,100 @@
+"""In-memory indexed career catalog.
+
+The catalog is loaded once, from `data/careers.json` or from the `careers`
+collection, and indexed by category, skill and growth potential plus a
+sorted title-token list for prefix search. Filters intersect the index
+postings, starting from the smallest, so lookups stay flat as the catalog
+grows. `version` is a hash of the loaded data and feeds response ETags.
+"""
+import hashlib
+import json
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent / "data" / "careers.json"
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def _norm(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+class CareerCatalog:
+    def __init__(self, careers: List[dict]):
+        self.careers = careers
+        self.version = hashlib.sha1(
+            json.dumps(careers, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()[:16]
+        self.by_category: Dict[str, Set[int]] = defaultdict(set)
+        self.by_skill: Dict[str, Set[int]] = defaultdict(set)
+        self.by_growth: Dict[str, Set[int]] = defaultdict(set)
+        tokens: List[Tuple[str, int]] = []
+        self._title_tokens: List[Tuple[str, ...]] = []
+        for i, career in enumerate(careers):
+            self.by_category[_norm(career.get("category", ""))].add(i)
+            self.by_growth[_norm(career.get("growth_potential", ""))].add(i)
+            for skill in career.get("skills", []):
+                self.by_skill[_norm(skill)].add(i)
+            title = _norm(career.get("title", ""))
+            title_tokens = (title, *_TOKEN.findall(title))
+            self._title_tokens.append(title_tokens)
+            tokens.extend((token, i) for token in title_tokens)
+        tokens.sort()
+        self._token_keys = [t for t, _ in tokens]
+        self._token_ids = [i for _, i in tokens]
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_CATALOG_PATH) -> "CareerCatalog":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    async def from_collection(cls, collection) -> "CareerCatalog":
+        careers = await collection.find({}, {"_id": 0}).sort("id", 1).to_list(None)
+        return cls(careers)
+
+    def _prefix(self, prefix: str) -> Set[int]:
+        prefix = _norm(prefix)
+        matches = set()
+        pos = bisect_left(self._token_keys, prefix)
+        while pos < len(self._token_keys) and self._token_keys[pos].startswith(prefix):
+            matches.add(self._token_ids[pos])
+            pos += 1
+        return matches
+
+    def search(self, category: Optional[str] = None, skill: Optional[str] = None,
+               growth: Optional[str] = None, q: Optional[str] = None,
+               offset: int = 0, limit: int = 50) -> Tuple[int, List[dict]]:
+        """Return (total matches, page of careers) in catalog order"""
+        postings = []
+        if category:
+            postings.append(self.by_category.get(_norm(category), set()))
+        if skill:
+            postings.append(self.by_skill.get(_norm(skill), set()))
+        if growth:
+            postings.append(self.by_growth.get(_norm(growth), set()))
+
+        if postings:
+            postings.sort(key=len)
+            matches = set(postings[0])
+            for other in postings[1:]:
+                matches.intersection_update(other)
+            if q:
+                # Cheaper to check the few remaining titles than to expand the prefix range
+                prefix = _norm(q)
+                matches = {i for i in matches if any(t.startswith(prefix) for t in self._title_tokens[i])}
+        elif q:
+            matches = self._prefix(q)
+        else:
+            return len(self.careers), self.careers[offset:offset + limit]
+
+        ids = sorted(matches)
+        return len(ids), [self.careers[i] for i in ids[offset:offset + limit]]
+
+    def etag(self, *query_parts) -> str:
+        digest = hashlib.sha1("|".join([self.version, *map(str, query_parts)]).encode()).hexdigest()
+        return f'"{digest[:20]}"'
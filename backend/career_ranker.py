@@ -0,0 +1,136 @@
+"""Vectorized profile-to-career similarity over the career catalog.
+
+Each career becomes an L2-normalized, IDF-weighted term vector built from its
+skills, category and title; the matrix is computed once per catalog. A
+profile (interests, skills, preferred industries) is vectorized the same way
+and scored against every career with one matrix-vector product.
+
+Offline batch scoring of a JSONL file of profiles:
+
+    python career_ranker.py profiles.jsonl --top-k 5 > ranked.jsonl
+"""
+import argparse
+import json
+import re
+import sys
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from career_catalog import CareerCatalog
+
+_WORD = re.compile(r"[a-z0-9+#]+")
+
+# Profile fields holding lists of phrases
+PROFILE_FIELDS = ("interests", "skills", "preferred_industries")
+
+# Relative weight of each career field in its vector
+FIELD_WEIGHTS = {"skills": 1.0, "category": 1.0, "title": 0.5}
+
+
+def _phrases(value) -> List[str]:
+    """A profile field as phrases: a bare string is one phrase, other non-lists none"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [phrase for phrase in value if isinstance(phrase, str)]
+    return []
+
+
+def _terms(phrase: str) -> List[str]:
+    """A phrase contributes itself plus its individual words"""
+    words = _WORD.findall(phrase.lower())
+    terms = list(words)
+    if len(words) > 1:
+        terms.append(" ".join(words))
+    return terms
+
+
+class CareerRanker:
+    def __init__(self, catalog: CareerCatalog):
+        self.catalog = catalog
+        self.vocabulary: Dict[str, int] = {}
+        rows = []
+        for career in catalog.careers:
+            weights: Dict[int, float] = {}
+            fields = {
+                "skills": career.get("skills", []),
+                "category": [career.get("category", "")],
+                "title": [career.get("title", "")],
+            }
+            for field, phrases in fields.items():
+                for phrase in phrases:
+                    for term in _terms(phrase):
+                        col = self.vocabulary.setdefault(term, len(self.vocabulary))
+                        weights[col] = max(weights.get(col, 0.0), FIELD_WEIGHTS[field])
+            rows.append(weights)
+
+        matrix = np.zeros((len(rows), max(len(self.vocabulary), 1)), dtype=np.float32)
+        for i, weights in enumerate(rows):
+            for col, weight in weights.items():
+                matrix[i, col] = weight
+        # Rare terms discriminate more than ones shared by many careers
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        self.idf = np.log((1 + len(rows)) / (1 + document_frequency)).astype(np.float32) + 1.0
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+
+    def vectorize(self, profiles: List[dict]) -> np.ndarray:
+        vectors = np.zeros((len(profiles), self.matrix.shape[1]), dtype=np.float32)
+        for i, profile in enumerate(profiles):
+            for key in PROFILE_FIELDS:
+                for phrase in _phrases(profile.get(key)):
+                    for term in _terms(phrase):
+                        col = self.vocabulary.get(term)
+                        if col is not None:
+                            vectors[i, col] = 1.0
+        vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def rank_batch(self, profiles: List[dict], k: int = 5) -> List[List[dict]]:
+        """Top-k careers with cosine scores for each profile"""
+        if not profiles or not len(self.catalog.careers):
+            return [[] for _ in profiles]
+        scores = self.vectorize(profiles) @ self.matrix.T
+        k = max(1, min(k, scores.shape[1]))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates], kind="stable")]
+            results.append([
+                {**self.catalog.careers[i], "score": round(float(scores[row, i]), 4)}
+                for i in ordered if scores[row, i] > 0
+            ])
+        return results
+
+    def rank(self, profile: dict, k: int = 5) -> List[dict]:
+        return self.rank_batch([profile], k)[0]
+
+
+def _read_profiles(lines: Iterable[str]) -> List[dict]:
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank careers for a JSONL file of profiles")
+    parser.add_argument("profiles", help="JSONL file with interests/skills/preferred_industries per line")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    ranker = CareerRanker(CareerCatalog.from_file())
+    with open(args.profiles, encoding="utf-8") as f:
+        profiles = _read_profiles(f)
+    for start in range(0, len(profiles), args.batch_size):
+        batch = profiles[start:start + args.batch_size]
+        for profile, matches in zip(batch, ranker.rank_batch(batch, args.top_k)):
+            sys.stdout.write(json.dumps({
+                "profile": profile,
+                "matches": [{"id": m["id"], "title": m["title"], "score": m["score"]} for m in matches]
+            }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
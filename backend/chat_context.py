@@ -0,0 +1,126 @@
+"""Token-budgeted prompt assembly for mentor chat.
+
+The newest turns of a conversation are included verbatim, walking backwards
+until the token budget is spent. Turns that fall out of the budget are folded
+into a rolling summary stored on the `conversations` document, so each turn
+only summarizes what fell out since the previous one and the prompt stays
+bounded however long the conversation gets.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from pagination import encode_cursor, in_range, keyset_filter, merge_messages
+
+ROLE_LABELS = {"user": "User", "assistant": "Mentor"}
+SUMMARY_LINE_CHARS = 160
+# Upper bound on messages read per turn; older unsummarized turns beyond it are skipped
+MAX_WALK = 200
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def _summary_line(message: dict) -> str:
+    text = " ".join(message["content"].split())
+    first_sentence = _SENTENCE_END.split(text, 1)[0]
+    if len(first_sentence) > SUMMARY_LINE_CHARS:
+        first_sentence = first_sentence[:SUMMARY_LINE_CHARS - 3] + "..."
+    return f"{ROLE_LABELS.get(message['role'], message['role'])}: {first_sentence}"
+
+
+def fold_summary(summary: str, messages: List[dict], max_tokens: int) -> str:
+    """Append one line per message (oldest first), dropping the oldest lines over budget"""
+    lines = summary.splitlines() if summary else []
+    lines.extend(_summary_line(m) for m in messages)
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+@dataclass
+class ChatContext:
+    prompt: str
+    prompt_tokens: int
+    history_turns: int
+    summary_tokens: int
+    conversation: dict = field(default_factory=dict)
+
+
+class ContextBuilder:
+    def __init__(self, token_budget: int = 3000, summary_tokens: int = 500):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+
+    async def build(self, db, user_id: str, conversation_id: str, message: str,
+                    exclude_message_id: Optional[str] = None,
+                    pending: Sequence[dict] = ()) -> ChatContext:
+        """`pending` holds messages accepted but not yet written to chat_messages"""
+        conversation = await db.conversations.find_one(
+            {"user_id": user_id, "conversation_id": conversation_id},
+            {"_id": 0}
+        ) or {}
+        summary = conversation.get("summary", "")
+
+        query = {
+            "user_id": user_id,
+            "conversation_id": conversation_id,
+            **keyset_filter(after=conversation.get("summary_until"))
+        }
+        if exclude_message_id:
+            query["message_id"] = {"$ne": exclude_message_id}
+
+        # Newest first: keep turns while they fit, everything older overflows.
+        # The summary's share of the budget is reserved up front.
+        remaining = self.token_budget - estimate_tokens(message) - self.summary_tokens
+        recent, overflow = [], []
+        stored = await db.chat_messages.find(query, {"_id": 0}).sort(
+            [("timestamp", -1), ("message_id", -1)]
+        ).limit(MAX_WALK).to_list(MAX_WALK)
+        unflushed = [
+            m for m in pending
+            if m["message_id"] != exclude_message_id and in_range(m, after=conversation.get("summary_until"))
+        ]
+        for past in merge_messages(stored, unflushed, descending=True)[:MAX_WALK]:
+            cost = estimate_tokens(past["content"]) + 2
+            if not overflow and cost <= remaining:
+                recent.append(past)
+                remaining -= cost
+            else:
+                overflow.append(past)
+
+        if overflow:
+            overflow.reverse()
+            summary = fold_summary(summary, overflow, self.summary_tokens)
+            # No upsert: the document is created by record_conversation_turn with
+            # its created_at; until then the overflow is folded again next turn
+            await db.conversations.update_one(
+                {"user_id": user_id, "conversation_id": conversation_id},
+                {"$set": {"summary": summary, "summary_until": encode_cursor(overflow[-1])}}
+            )
+        recent.reverse()
+
+        prompt = self._assemble(summary, recent, message)
+        return ChatContext(
+            prompt=prompt,
+            prompt_tokens=estimate_tokens(prompt),
+            history_turns=len(recent),
+            summary_tokens=estimate_tokens(summary) if summary else 0,
+            conversation=conversation
+        )
+
+    def _assemble(self, summary: str, recent: List[dict], message: str) -> str:
+        if not summary and not recent:
+            return message
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation:\n{summary}")
+        if recent:
+            turns = "\n".join(f"{ROLE_LABELS.get(m['role'], m['role'])}: {m['content']}" for m in recent)
+            parts.append(f"Recent conversation:\n{turns}")
+        parts.append(f"User: {message}")
+        return "\n\n".join(parts)
@@ -0,0 +1,178 @@
+"""Data-driven selection of MCQ questions and suggested options for chat.
+
+Rules live in `data/chat_rules.json` and are evaluated in file order, with
+substring keyword semantics. Small rule sets, like the shipped one, are
+checked rule by rule with `in` until one matches, as the original if-chain
+did; that beats any single scan when there are a few dozen keywords. From
+REGEX_MIN_KEYWORDS keywords on, every keyword is compiled into one
+trie-shaped regex, so a message is lowercased and scanned once no matter how
+many rules there are; the scan yields the set of rules whose keywords occur
+in the message. `benchmarks/bench_chat_rules.py` measures the crossover.
+Either way no keyword work is done on turns where no eligible rule depends
+on keywords, and responses are built once at load time and shared.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+DEFAULT_RULES_PATH = Path(__file__).parent / "data" / "chat_rules.json"
+
+# Below this many distinct keywords, rule-by-rule `in` checks are faster
+REGEX_MIN_KEYWORDS = 64
+
+
+class McqRule(NamedTuple):
+    name: str
+    user_turns: Optional[int]
+    min_user_turns: Optional[int]
+    keywords: Tuple[str, ...]
+    question: object
+
+
+class SuggestionRule(NamedTuple):
+    name: str
+    keywords: Tuple[str, ...]
+    options: Tuple[str, ...]
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex alternation with shared prefixes factored out, longest match first"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """Multi-keyword matcher returning the tags whose keywords occur.
+
+    Each search jumps to the next offset where any keyword starts (the regex
+    engine's literal-prefix scan does the skipping) and the greedy trie
+    pattern takes the longest keyword there; shorter keywords at the same
+    offset are its prefixes and are credited through a prefix closure
+    computed up front. Resuming one character after each match start keeps
+    overlapping occurrences.
+    """
+
+    def __init__(self, keywords: Dict[str, FrozenSet[str]]):
+        self._tags = {
+            keyword: frozenset().union(*(tags for other, tags in keywords.items() if keyword.startswith(other)))
+            for keyword in keywords
+        }
+        self._search = re.compile(_trie_pattern(list(keywords))).search if keywords else None
+
+    def match(self, text: str) -> FrozenSet[str]:
+        if self._search is None:
+            return frozenset()
+        text = text.lower()
+        found = set()
+        m = self._search(text)
+        while m:
+            found.update(self._tags[m.group()])
+            m = self._search(text, m.start() + 1)
+        return frozenset(found)
+
+
+class ChatRuleEngine:
+    def __init__(self, config: dict, mcq_factory: Callable[..., object] = dict,
+                 regex_min_keywords: int = REGEX_MIN_KEYWORDS):
+        keywords: Dict[str, set] = {}
+
+        def register(tag: str, words: List[str]) -> Tuple[str, ...]:
+            for word in words:
+                keywords.setdefault(word.lower(), set()).add(tag)
+            return tuple(word.lower() for word in words)
+
+        self.mcq_rules: List[McqRule] = []
+        for rule in config.get("mcq", []):
+            when = rule.get("when", {})
+            tag = f"mcq:{rule['name']}"
+            self.mcq_rules.append(McqRule(
+                name=tag,
+                user_turns=when.get("user_turns"),
+                min_user_turns=when.get("min_user_turns"),
+                keywords=register(tag, when.get("keywords", [])),
+                question=mcq_factory(question=rule["question"], options=list(rule["options"]), type=rule["type"])
+            ))
+
+        suggestions = config.get("suggestions", {})
+        self.suggestion_max_messages = suggestions.get("max_messages", 2)
+        self.suggestion_rules: List[SuggestionRule] = []
+        for rule in suggestions.get("rules", []):
+            tag = f"suggest:{rule['name']}"
+            self.suggestion_rules.append(SuggestionRule(tag, register(tag, rule["keywords"]), tuple(rule["options"])))
+        self.default_suggestions = tuple(suggestions.get("default", ()))
+
+        # None: small rule set, checked rule by rule in select()
+        self.matcher = (
+            KeywordMatcher({k: frozenset(v) for k, v in keywords.items()})
+            if len(keywords) >= regex_min_keywords else None
+        )
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_RULES_PATH, **kwargs) -> "ChatRuleEngine":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def select(self, message: str, user_turns: int, message_count: int):
+        """(mcq question or None, suggested options) for a turn.
+
+        Counts include the current user message.
+        """
+        matcher = self.matcher
+        # Computed on first need: the lowercased message for rule-by-rule
+        # checks, or every matching tag from one regex scan
+        lowered = tags = None
+
+        mcq = None
+        for rule in self.mcq_rules:
+            if rule.user_turns is not None and user_turns != rule.user_turns:
+                continue
+            if rule.min_user_turns is not None and user_turns < rule.min_user_turns:
+                continue
+            if rule.keywords:
+                if matcher is None:
+                    if lowered is None:
+                        lowered = message.lower()
+                    if not any(word in lowered for word in rule.keywords):
+                        continue
+                else:
+                    if tags is None:
+                        tags = matcher.match(message)
+                    if rule.name not in tags:
+                        continue
+            mcq = rule.question
+            break
+
+        suggestions = ()
+        if message_count <= self.suggestion_max_messages and mcq is None:
+            suggestions = self.default_suggestions
+            if matcher is None:
+                if lowered is None:
+                    lowered = message.lower()
+                for rule in self.suggestion_rules:
+                    if any(word in lowered for word in rule.keywords):
+                        suggestions = rule.options
+                        break
+            else:
+                if tags is None:
+                    tags = matcher.match(message)
+                for rule in self.suggestion_rules:
+                    if rule.name in tags:
+                        suggestions = rule.options
+                        break
+        return mcq, suggestions
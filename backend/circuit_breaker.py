@@ -0,0 +1,100 @@
+"""Fail-fast circuit breaker for the LLM provider.
+
+Outcomes of recent upstream calls are kept for `window` seconds. Once at
+least `min_calls` have completed in the window and the share of failures
+reaches `error_threshold`, the breaker opens: calls are refused with
+`CircuitOpen` immediately instead of each waiting out its own timeout.
+After `open_seconds` one probe call is let through (half-open); its success
+closes the breaker, its failure opens it again.
+"""
+import time
+from collections import deque
+
+
+class CircuitOpen(Exception):
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM circuit open, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, error_threshold: float = 0.5, min_calls: int = 10, window: float = 30.0,
+                 open_seconds: float = 30.0):
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._outcomes = deque()  # (monotonic time, ok)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def allow(self):
+        """Raise CircuitOpen unless a call may go upstream now"""
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "open":
+            retry_in = self._opened_at + self.open_seconds - now
+            if retry_in > 0:
+                self.rejected += 1
+                raise CircuitOpen(retry_in)
+            self.state = "half_open"
+        if self._probing:
+            self.rejected += 1
+            raise CircuitOpen(0)
+        self._probing = True
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._probing = False
+            if ok:
+                self.state = "closed"
+                self._outcomes.clear()
+                self._failures = 0
+            else:
+                self._open(now)
+            return
+        if self.state == "open":
+            return  # a call admitted before the breaker opened
+        self._outcomes.append((now, ok))
+        if not ok:
+            self._failures += 1
+        self._trim(now)
+        if len(self._outcomes) >= self.min_calls and self._failures / len(self._outcomes) >= self.error_threshold:
+            self._open(now)
+
+    def cancelled(self):
+        """An admitted call ended without an outcome (e.g. it lost a hedge race)"""
+        if self.state == "half_open":
+            self._probing = False
+
+    def _open(self, now: float):
+        self.state = "open"
+        self._opened_at = now
+        self.opened += 1
+
+    @property
+    def closed(self) -> bool:
+        return self.state == "closed"
+
+    def stats(self) -> dict:
+        self._trim(time.monotonic())
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "window_error_rate": round(self._failures / calls, 3) if calls else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,86 @@
+"""Per-conversation summary documents backing the /chat/history listing.
+
+Each chat turn updates its `conversations` document atomically, so listing a
+user's conversations is a single indexed read instead of an aggregation over
+every message they have sent.
+"""
+import logging
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 200
+
+
+def message_preview(message_doc: dict) -> dict:
+    return {
+        "message_id": message_doc["message_id"],
+        "role": message_doc["role"],
+        "content": message_doc["content"][:PREVIEW_LENGTH],
+        "timestamp": message_doc["timestamp"],
+    }
+
+
+async def record_conversation_turn(db, user_id: str, conversation_id: str, last_message: dict,
+                                   messages: int = 2, user_turns: int = 1):
+    """Fold one turn (by default a user message plus the reply) into the summary"""
+    await db.conversations.update_one(
+        {"user_id": user_id, "conversation_id": conversation_id},
+        {
+            "$set": {
+                "last_message": message_preview(last_message),
+                "last_timestamp": last_message["timestamp"],
+            },
+            "$inc": {"message_count": messages, "user_turn_count": user_turns},
+            "$setOnInsert": {"created_at": last_message["timestamp"]},
+        },
+        upsert=True
+    )
+
+
+async def list_conversations(db, user_id: str, limit: int = 50):
+    return await db.conversations.find(
+        {"user_id": user_id},
+        # The rolling prompt summary chat_context keeps on the document is internal
+        {"_id": 0, "summary": 0, "summary_until": 0}
+    ).sort("last_timestamp", -1).limit(limit).to_list(limit)
+
+
+async def backfill_conversations(db, batch_size: int = 500) -> int:
+    """Rebuild every conversation summary from chat_messages"""
+    pipeline = [
+        {"$sort": {"timestamp": -1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "conversation_id": "$conversation_id"},
+            "last_message": {"$first": "$$ROOT"},
+            "message_count": {"$sum": 1},
+            "user_turn_count": {"$sum": {"$cond": [{"$eq": ["$role", "user"]}, 1, 0]}},
+            "created_at": {"$min": "$timestamp"},
+        }},
+    ]
+    written = 0
+    batch = []
+    async for group in db.chat_messages.aggregate(pipeline, allowDiskUse=True):
+        key = group["_id"]
+        last_message = group["last_message"]
+        batch.append(UpdateOne(
+            {"user_id": key["user_id"], "conversation_id": key["conversation_id"]},
+            {"$set": {
+                "last_message": message_preview(last_message),
+                "last_timestamp": last_message["timestamp"],
+                "message_count": group["message_count"],
+                "user_turn_count": group["user_turn_count"],
+                "created_at": group["created_at"],
+            }},
+            upsert=True
+        ))
+        if len(batch) >= batch_size:
+            await db.conversations.bulk_write(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        await db.conversations.bulk_write(batch, ordered=False)
+        written += len(batch)
+    logger.info(f"Backfilled {written} conversation summaries")
+    return written
@@ -0,0 +1,178 @@
+"""Index bootstrap and data migrations.
+
+`ensure_indexes` runs on app startup and is safe to repeat. The same
+routines can be run on demand from the backend directory:
+
+    python db_maintenance.py indexes
+    python db_maintenance.py migrate-sessions
+    python db_maintenance.py backfill-conversations
+    python db_maintenance.py import-careers
+    python db_maintenance.py reconcile-stats
+    python db_maintenance.py backfill-roadmaps
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import OperationFailure
+
+from career_catalog import DEFAULT_CATALOG_PATH
+from conversations import backfill_conversations
+from roadmaps import backfill_roadmaps
+from user_stats import reconcile_user_stats
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Only removes documents whose expires_at is a BSON date
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "chat_messages": [
+        IndexModel(
+            [("user_id", ASCENDING), ("conversation_id", ASCENDING),
+             ("timestamp", ASCENDING), ("message_id", ASCENDING)],
+            name="user_conversation_timestamp_message"
+        ),
+        IndexModel([("message_id", ASCENDING)], name="message_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("role", ASCENDING)], name="user_role"),
+    ],
+    "conversations": [
+        IndexModel(
+            [("user_id", ASCENDING), ("conversation_id", ASCENDING)],
+            name="user_conversation_unique", unique=True
+        ),
+        IndexModel([("user_id", ASCENDING), ("last_timestamp", DESCENDING)], name="user_last_timestamp"),
+    ],
+    "roadmaps": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+        IndexModel([("roadmap_id", ASCENDING)], name="roadmap_id_unique", unique=True),
+    ],
+    "roadmap_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "rate_limits": [
+        IndexModel([("bucket", ASCENDING), ("key", ASCENDING)], name="bucket_key_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "user_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "career_profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "careers": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "roadmap_cache": [
+        IndexModel([("cache_key", ASCENDING)], name="cache_key_unique", unique=True),
+        IndexModel([("last_used_at", ASCENDING)], name="last_used_at"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """Create any missing indexes. A failing index is logged, not fatal."""
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection].create_indexes([index])
+            except OperationFailure as e:
+                logger.error(f"Index {index.document['name']} failed on {collection}: {e}")
+    logger.info(f"Indexes ensured on {len(INDEXES)} collections")
+
+
+async def migrate_session_expiry(db, batch_size: int = 1000) -> int:
+    """Convert ISO-string expires_at/created_at on user_sessions to BSON dates.
+
+    The TTL index ignores string values, so sessions written before this
+    migration would otherwise never be removed.
+    """
+    migrated = 0
+    cursor = db.user_sessions.find(
+        {"$or": [{"expires_at": {"$type": "string"}}, {"created_at": {"$type": "string"}}]},
+        {"_id": 1, "expires_at": 1, "created_at": 1}
+    )
+    batch = []
+    async for doc in cursor:
+        update = {}
+        for field in ("expires_at", "created_at"):
+            if isinstance(doc.get(field), str):
+                try:
+                    update[field] = _parse_iso(doc[field])
+                except ValueError:
+                    logger.warning(f"Unparseable {field} on session {doc['_id']}: {doc[field]!r}")
+        if not update:
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(batch) >= batch_size:
+            migrated += (await db.user_sessions.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        migrated += (await db.user_sessions.bulk_write(batch, ordered=False)).modified_count
+    logger.info(f"Migrated {migrated} session documents to BSON dates")
+    return migrated
+
+
+async def import_careers(db, path: Path = DEFAULT_CATALOG_PATH) -> int:
+    """Upsert the career catalog file into the careers collection"""
+    with open(path, encoding="utf-8") as f:
+        careers = json.load(f)
+    if careers:
+        await db.careers.bulk_write(
+            [UpdateOne({"id": c["id"]}, {"$set": c}, upsert=True) for c in careers],
+            ordered=False
+        )
+    logger.info(f"Imported {len(careers)} careers from {path}")
+    return len(careers)
+
+
+def _parse_iso(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+COMMANDS = {
+    "indexes": ensure_indexes,
+    "migrate-sessions": migrate_session_expiry,
+    "backfill-conversations": backfill_conversations,
+    "import-careers": import_careers,
+    "reconcile-stats": reconcile_user_stats,
+    "backfill-roadmaps": backfill_roadmaps,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database maintenance tasks")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        asyncio.run(COMMANDS[args.command](client[os.environ['DB_NAME']]))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Local stand-in for LlmChat, used when LLM_BACKEND=fake.
+
+Returns a deterministic reply derived from the prompt and can stream it in
+chunks with a configurable delay, so streaming and latency behaviour can be
+exercised without network access or an API key.
+
+Faults can be injected to exercise timeouts, hedging and the circuit
+breaker; each call draws from one seeded generator:
+
+    FAKE_LLM_ERROR_RATE   share of calls that fail before the first token
+    FAKE_LLM_SLOW_RATE    share of calls delayed by FAKE_LLM_SLOW_DELAY seconds
+    FAKE_LLM_HANG_RATE    share of calls that never answer
+    FAKE_LLM_SEED         seed for the fault draws
+"""
+import asyncio
+import hashlib
+import os
+import random
+from typing import AsyncIterator
+
+_faults = random.Random(os.environ.get('FAKE_LLM_SEED', 'fake-llm'))
+
+
+class FakeLlmError(RuntimeError):
+    pass
+
+
+class UserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeLlmChat:
+    def __init__(self, api_key=None, session_id: str = "", system_message: str = ""):
+        self.session_id = session_id
+        self.system_message = system_message
+        self.first_token_delay = float(os.environ.get('FAKE_LLM_FIRST_TOKEN_DELAY', 0.05))
+        self.chunk_delay = float(os.environ.get('FAKE_LLM_CHUNK_DELAY', 0.01))
+        self.error_rate = float(os.environ.get('FAKE_LLM_ERROR_RATE', 0))
+        self.slow_rate = float(os.environ.get('FAKE_LLM_SLOW_RATE', 0))
+        self.slow_delay = float(os.environ.get('FAKE_LLM_SLOW_DELAY', 5))
+        self.hang_rate = float(os.environ.get('FAKE_LLM_HANG_RATE', 0))
+
+    def with_model(self, provider: str, model: str) -> "FakeLlmChat":
+        self.provider = provider
+        self.model = model
+        return self
+
+    def _reply(self, text: str) -> str:
+        digest = hashlib.sha1(text.encode()).hexdigest()[:8]
+        if "Step 1:" in self.system_message:
+            # Roadmap prompt: answer in the step format it asks for
+            return "\n\n".join(
+                f"Step {n}: Fake phase {n} [{digest}]\nDuration: {n + 1} weeks\n"
+                f"Practice the material for phase {n}.\n• Skill {n}a\n• Skill {n}b"
+                for n in range(1, 5)
+            )
+        return (
+            f"[fake:{digest}] Thanks for asking about \"{text[:60]}\". "
+            "Start by mapping your interests to a few concrete roles, "
+            "then build the core skills for one of them step by step."
+        )
+
+    async def send_message(self, user_message) -> str:
+        chunks = [chunk async for chunk in self.stream_message(user_message)]
+        return "".join(chunks)
+
+    async def stream_message(self, user_message) -> AsyncIterator[str]:
+        words = self._reply(user_message.text).split(" ")
+        await asyncio.sleep(self.first_token_delay)
+        await self._inject_fault()
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+    async def _inject_fault(self):
+        draw = _faults.random()
+        if draw < self.error_rate:
+            raise FakeLlmError("injected provider error")
+        draw -= self.error_rate
+        if draw < self.hang_rate:
+            await asyncio.Event().wait()
+        draw -= self.hang_rate
+        if draw < self.slow_rate:
+            await asyncio.sleep(self.slow_delay)
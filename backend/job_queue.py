@@ -0,0 +1,240 @@
+"""Mongo-backed background jobs run by a bounded pool of asyncio workers.
+
+`submit` records a job as `queued` and hands its id to the local workers.
+A worker claims a job by atomically flipping it to `running` with a lease,
+calls the handler and stores the result (`succeeded`) or, on an exception,
+`failure_message` (`failed`); the exception itself is only logged.
+Handlers can report progress through the callback they are given.
+
+Jobs survive restarts: `recover` (run at startup and then periodically)
+re-queues jobs left `queued` by a previous process and `running` jobs
+whose lease has expired, up to `max_attempts`. Several processes can share
+one collection since claims are atomic. Finished jobs expire through a TTL
+index on `expires_at`.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ("queued", "running")
+
+Handler = Callable[[dict, Callable[[str], Awaitable[None]]], Awaitable[dict]]
+
+
+def public_job(job: dict) -> dict:
+    """API view of a job document"""
+    view = {k: job.get(k) for k in ("job_id", "kind", "status", "stage", "result", "error", "attempts")}
+    for field in ("created_at", "updated_at", "finished_at"):
+        value = job.get(field)
+        if isinstance(value, datetime):
+            # Mongo hands back naive UTC datetimes
+            value = (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+        view[field] = value
+    return view
+
+
+class JobQueue:
+    def __init__(self, collection, handlers: Dict[str, Handler], workers: int = 4,
+                 lease_seconds: float = 300, max_attempts: int = 3,
+                 retention: timedelta = timedelta(days=1), recover_interval: float = 60,
+                 failure_message: str = "Job failed"):
+        self.collection = collection
+        self.handlers = handlers
+        self.workers = workers
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.recover_interval = recover_interval
+        # What clients see for a failed job; the exception itself only goes to the log
+        self.failure_message = failure_message
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._local = set()
+        self._tasks = []
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._closing = False
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def _ensure_started(self):
+        if self._closing or self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._sweep()))
+
+    async def submit(self, kind: str, user_id: str, params: dict) -> dict:
+        if self._closing:
+            raise RuntimeError("job queue is shut down")
+        now = datetime.now(timezone.utc)
+        job = {
+            "job_id": f"job_{uuid.uuid4().hex[:12]}",
+            "kind": kind,
+            "user_id": user_id,
+            "params": params,
+            "status": "queued",
+            "stage": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.collection.insert_one(dict(job))
+        self.submitted += 1
+        self._enqueue(job["job_id"])
+        return job
+
+    def _enqueue(self, job_id: str):
+        if job_id in self._local:
+            return
+        self._ensure_started()
+        self._local.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"job_id": job_id, "user_id": user_id}, {"_id": 0})
+
+    async def watch(self, job_id: str, user_id: str, poll_interval: float = 1.0) -> AsyncIterator[dict]:
+        """Yield the job each time it changes until it finishes.
+
+        Updates made by this process wake the watcher immediately; jobs run
+        by another process are picked up by polling.
+        """
+        last = None
+        while True:
+            event = self._changed.setdefault(job_id, asyncio.Event())
+            job = await self.get(job_id, user_id)
+            if job is None:
+                self._changed.pop(job_id, None)
+                return
+            state = (job["status"], job.get("stage"), job.get("attempts"))
+            if state != last:
+                last = state
+                yield job
+            if job["status"] not in ACTIVE_STATES:
+                self._changed.pop(job_id, None)
+                return
+            try:
+                await asyncio.wait_for(event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def recover(self) -> int:
+        """Re-queue jobs orphaned by a restart; returns how many were queued"""
+        now = datetime.now(timezone.utc)
+        expired = {"status": "running", "lease_expires_at": {"$lt": now}}
+        await self.collection.update_many(
+            {**expired, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed", "stage": "failed", "error": "Job was interrupted too many times",
+                      "updated_at": now, "finished_at": now, "expires_at": now + self.retention}}
+        )
+        await self.collection.update_many(
+            expired,
+            {"$set": {"status": "queued", "stage": "queued", "updated_at": now}, "$unset": {"lease_expires_at": ""}}
+        )
+        queued = await self.collection.find({"status": "queued"}, {"_id": 0, "job_id": 1}).to_list(None)
+        orphaned = [job["job_id"] for job in queued if job["job_id"] not in self._local]
+        for job_id in orphaned:
+            self._enqueue(job_id)
+        if orphaned:
+            self.recovered += len(orphaned)
+            logger.info(f"Recovered {len(orphaned)} queued jobs")
+        return len(orphaned)
+
+    async def _claim(self, job_id: str) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"job_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "stage": "started", "updated_at": now,
+                      "lease_expires_at": now + self.lease},
+             "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _update(self, job_id: str, fields: dict, unset: Optional[dict] = None):
+        update = {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}}
+        if unset:
+            update["$unset"] = unset
+        await self.collection.update_one({"job_id": job_id}, update)
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _finish(self, job_id: str, fields: dict):
+        now = datetime.now(timezone.utc)
+        await self._update(job_id, {**fields, "finished_at": now, "expires_at": now + self.retention},
+                           unset={"lease_expires_at": ""})
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._local.discard(job_id)
+            try:
+                job = await self._claim(job_id)
+            except Exception as e:
+                # Still queued in Mongo; the next recovery sweep retries it
+                logger.error(f"Could not claim job {job_id}: {e}")
+                continue
+            if job is None:
+                continue  # claimed by another worker or process, or already finished
+
+            async def report(stage: str, job_id=job_id):
+                # Progress doubles as a heartbeat that keeps the lease alive;
+                # a failed write only costs a stale stage, not the job
+                try:
+                    await self._update(job_id, {"stage": stage,
+                                                "lease_expires_at": datetime.now(timezone.utc) + self.lease})
+                except Exception as e:
+                    logger.warning(f"Could not report progress of job {job_id}: {e}")
+
+            try:
+                result = await self.handlers[job["kind"]](job, report)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job back so the next start picks it up
+                await asyncio.shield(self._update(
+                    job_id, {"status": "queued", "stage": "queued"}, unset={"lease_expires_at": ""}
+                ))
+                raise
+            except Exception:
+                logger.exception(f"Job {job_id} ({job['kind']}) failed")
+                self.failed += 1
+                outcome = {"status": "failed", "stage": "failed", "error": self.failure_message}
+            else:
+                self.succeeded += 1
+                outcome = {"status": "succeeded", "stage": "done", "result": result}
+            try:
+                await self._finish(job_id, outcome)
+            except Exception as e:
+                # The worker must survive; the job stays `running` until its
+                # lease expires and the recovery sweep re-queues or fails it
+                logger.error(f"Could not record the outcome of job {job_id}: {e}")
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.recover_interval)
+            try:
+                await self.recover()
+            except Exception as e:
+                logger.error(f"Job recovery sweep failed: {e}")
+
+    async def stop(self):
+        self._closing = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued_locally": self._queue.qsize(),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered,
+        }
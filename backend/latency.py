@@ -0,0 +1,34 @@
+"""Sliding-window latency statistics."""
+from collections import deque
+
+
+class LatencyWindow:
+    """Call counters plus a sliding window of recent latencies for percentiles"""
+
+    def __init__(self, size: int = 512):
+        self.samples = deque(maxlen=size)
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def record(self, elapsed_ms: float, ok: bool = True):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.samples.append(elapsed_ms)
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "p50_ms": round(self.percentile(0.50), 1),
+            "p95_ms": round(self.percentile(0.95), 1),
+        }
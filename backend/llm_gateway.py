@@ -0,0 +1,304 @@
+"""Process-wide entry point for LLM calls.
+
+All routes go through one `LlmGateway`, which owns the registry of system
+prompts, per-call model routing across providers (see llm_providers.py),
+a priority scheduler that caps
+concurrent upstream calls (see llm_scheduler.py), single-flight coalescing for
+one-shot prompts and per-prompt latency statistics. Each call runs within a
+deadline budget behind a circuit breaker per provider (circuit_breaker.py),
+and prompts listed in `hedge_prompts` get a second attempt when the first
+is slow.
+
+LlmChat instances carry their own message history, so a fresh client is
+bound per call from the prebuilt configuration; the HTTP connection pool
+underneath is shared process-wide by the provider SDK.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, Iterable
+
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from latency import LatencyWindow
+from llm_providers import ModelRouter, Route, build_providers
+from llm_scheduler import Overloaded, PriorityClass, PriorityScheduler
+from metrics import registry
+from tracing import record_span
+from singleflight import SingleFlight, fingerprint
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPTS = {
+    "mentor": """You are an expert AI Career Mentor helping students discover careers,
+            build skills, and create personalized learning roadmaps. Be encouraging, insightful,
+            and provide actionable advice. When discussing careers, mention required skills,
+            typical responsibilities, growth potential, and learning resources.
+
+            After providing your response, if relevant, suggest 2-3 follow-up questions or topics
+            the user might want to explore. Format these as simple, clear options.""",
+    "explain": "You are a career advisor. In one or two sentences per career, explain why each listed career fits the user's profile.",
+    "roadmap": """You are a career development expert. Create detailed, actionable learning roadmaps.
+        Format your response as clear steps with this structure:
+
+        Step 1: [Title]
+        Duration: [X weeks/months]
+        Description of what to learn and do
+        • Key skill 1
+        • Key skill 2
+        • Key skill 3
+
+        Use this format consistently for all steps. Keep descriptions concise (2-3 sentences max per step).""",
+}
+
+
+# Scheduling class of each prompt: interactive chat first, bulk roadmaps last
+PROMPT_CLASSES = {"mentor": "interactive", "explain": "recommend", "roadmap": "bulk"}
+
+DEFAULT_CLASSES = {
+    "interactive": PriorityClass(priority=0, max_wait=5.0, max_queue=64),
+    "recommend": PriorityClass(priority=1, max_wait=10.0, max_queue=64),
+    "bulk": PriorityClass(priority=2, max_wait=120.0, max_queue=256),
+}
+
+
+# Seconds a call may spend queueing plus waiting on the provider
+DEFAULT_BUDGETS = {"mentor": 30.0, "explain": 20.0, "roadmap": 120.0}
+
+# Latency samples needed before a hedge delay (the prompt's p95) is trusted
+HEDGE_MIN_SAMPLES = 20
+
+
+class LlmTimeout(Exception):
+    pass
+
+
+llm_call_seconds = registry.histogram(
+    "llm_call_duration_seconds", "Upstream LLM call latency by prompt, model and outcome",
+    ("prompt", "model", "outcome")
+)
+llm_call_errors = registry.counter(
+    "llm_call_errors", "LLM calls that failed upstream or timed out, by prompt, model and outcome",
+    ("prompt", "model", "outcome")
+)
+llm_call_rejections = registry.counter(
+    "llm_call_rejections", "LLM calls refused before reaching the provider, by prompt and reason",
+    ("prompt", "reason")
+)
+
+
+class LlmGateway:
+    def __init__(self, api_key: str = None, router: ModelRouter = None, providers: Dict[str, object] = None,
+                 max_concurrency: int = 32, classes: Dict[str, PriorityClass] = None,
+                 budgets: Dict[str, float] = None, hedge_prompts: Iterable[str] = (),
+                 breaker_options: dict = None):
+        self.router = router or ModelRouter.single("openai", "gpt-5.2")
+        # LLM_BACKEND=fake answers every route offline
+        self.providers = providers or build_providers(api_key, offline=os.environ.get('LLM_BACKEND') == 'fake')
+        self.scheduler = PriorityScheduler(max_concurrency, classes or DEFAULT_CLASSES)
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.hedge_prompts = frozenset(hedge_prompts)
+        # One breaker per provider, so a failing vendor does not block routes to the others
+        self.breaker_options = breaker_options or {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.flights = SingleFlight()
+        self.latency: Dict[str, LatencyWindow] = {name: LatencyWindow() for name in SYSTEM_PROMPTS}
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self.breakers.get(provider)
+        if breaker is None:
+            breaker = self.breakers[provider] = CircuitBreaker(**self.breaker_options)
+        return breaker
+
+    def _route(self, prompt_name: str, text: str, tier: str = None) -> Route:
+        return self.router.route(prompt_name, PROMPT_CLASSES[prompt_name], text, tier)
+
+    def _new_chat(self, prompt_name: str, route: Route, session_id: str):
+        provider = self.providers.get(route.provider)
+        if provider is None:
+            raise ValueError(f"No LLM provider registered for '{route.provider}'")
+        return provider.new_chat(route, session_id, SYSTEM_PROMPTS[prompt_name])
+
+    async def complete(self, prompt_name: str, text: str, session_id: str, coalesce: bool = False,
+                       budget: float = None, tier: str = None) -> str:
+        """One completion for `text` under the named system prompt.
+
+        The model comes from the routing table, given the prompt, its
+        scheduling class, the text length and the user's latency `tier`.
+        With coalesce=True, concurrent calls with an identical prompt share
+        one upstream request (only use for prompts without per-user context).
+        `budget` (default per prompt, DEFAULT_BUDGETS) bounds queueing plus
+        the upstream call. Raises Overloaded when the scheduler sheds the
+        call, CircuitOpen while the provider is failing and LlmTimeout when
+        the budget runs out.
+        """
+        deadline = time.monotonic() + (budget or self.budgets[prompt_name])
+        route = self._route(prompt_name, text, tier)
+        if coalesce:
+            key = fingerprint(route.provider, route.model, SYSTEM_PROMPTS[prompt_name], text)
+            return await self.flights.do(
+                key, lambda: self._complete(prompt_name, route, text, session_id, deadline)
+            )
+        return await self._complete(prompt_name, route, text, session_id, deadline)
+
+    async def _complete(self, prompt_name: str, route: Route, text: str, session_id: str, deadline: float) -> str:
+        if prompt_name in self.hedge_prompts:
+            return await self._hedged(prompt_name, route, text, session_id, deadline)
+        return await self._attempt(prompt_name, route, text, session_id, deadline)
+
+    async def _admit(self, prompt_name: str, route: Route, deadline: float, acquired: bool = False):
+        """Breaker check, then a scheduler slot within what is left of the budget"""
+        breaker = self._breaker(route.provider)
+        try:
+            breaker.allow()
+        except CircuitOpen:
+            llm_call_rejections.inc(prompt_name, "circuit_open")
+            raise
+        if acquired:
+            return
+        class_name = PROMPT_CLASSES[prompt_name]
+        max_wait = min(self.scheduler.classes[class_name].max_wait, deadline - time.monotonic())
+        started = time.perf_counter()
+        try:
+            await self.scheduler.acquire(class_name, max_wait)
+        except BaseException as e:
+            breaker.cancelled()
+            if isinstance(e, Overloaded):
+                llm_call_rejections.inc(prompt_name, "shed")
+            raise
+        finally:
+            record_span("llm.queue", started, time.perf_counter(), timing="llm_queue", priority_class=class_name)
+
+    async def _attempt(self, prompt_name: str, route: Route, text: str, session_id: str, deadline: float,
+                       acquired: bool = False) -> str:
+        await self._admit(prompt_name, route, deadline, acquired)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            chat, message_cls = self._new_chat(prompt_name, route, session_id)
+            response = await asyncio.wait_for(
+                chat.send_message(message_cls(text=text)), timeout=deadline - time.monotonic()
+            )
+            outcome = "ok"
+            return response
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise LlmTimeout(f"LLM call '{prompt_name}' exceeded its budget") from None
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._finish(prompt_name, route, started, outcome)
+
+    async def _hedged(self, prompt_name: str, route: Route, text: str, session_id: str, deadline: float) -> str:
+        """Fire a second attempt if the first is slower than this prompt's p95.
+
+        The hedge only goes out when a scheduler slot is free right away and
+        the breaker is closed, so hedging never queues or adds load to a
+        struggling provider. The first successful answer wins.
+        """
+        window = self.latency[prompt_name]
+        first = asyncio.ensure_future(self._attempt(prompt_name, route, text, session_id, deadline))
+        second = None
+        # From here on an unfinished attempt is cancelled however we leave,
+        # including when the caller itself is cancelled while waiting
+        try:
+            if len(window.samples) < HEDGE_MIN_SAMPLES:
+                return await first
+            done, _ = await asyncio.wait({first}, timeout=window.percentile(0.95) / 1000)
+            if (done or not self._breaker(route.provider).closed
+                    or not self.scheduler.try_acquire(PROMPT_CLASSES[prompt_name])):
+                return await first
+
+            self.hedges += 1
+            second = asyncio.ensure_future(
+                self._attempt(prompt_name, route, text, session_id, deadline, acquired=True)
+            )
+            pending = {first, second}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                if not pending:
+                    return first.result()  # both failed: raise the original attempt's error
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def stream(self, prompt_name: str, text: str, session_id: str,
+                     budget: float = None, tier: str = None) -> AsyncIterator[str]:
+        """Yield response chunks.
+
+        Only clients with `stream_message` stream incrementally. The
+        emergentintegrations LlmChat has no streaming API, so for its routes
+        the whole reply is yielded as one chunk after generation finishes.
+        """
+        deadline = time.monotonic() + (budget or self.budgets[prompt_name])
+        route = self._route(prompt_name, text, tier)
+        await self._admit(prompt_name, route, deadline)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            chat, message_cls = self._new_chat(prompt_name, route, session_id)
+            if hasattr(chat, "stream_message"):
+                chunks = chat.stream_message(message_cls(text=text)).__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - time.monotonic())
+                    except StopAsyncIteration:
+                        break
+                    if chunk:
+                        yield chunk
+            else:
+                yield await asyncio.wait_for(
+                    chat.send_message(message_cls(text=text)), timeout=deadline - time.monotonic()
+                )
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise LlmTimeout(f"LLM stream '{prompt_name}' exceeded its budget") from None
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._finish(prompt_name, route, started, outcome)
+
+    def _finish(self, prompt_name: str, route: Route, started: float, outcome: str):
+        ended = time.perf_counter()
+        elapsed_ms = (ended - started) * 1000
+        model = str(route)
+        record_span(f"llm.{prompt_name}", started, ended, timing="llm", error=outcome not in ("ok", "cancelled"),
+                    model=model, outcome=outcome)
+        self.scheduler.release(elapsed_ms)
+        llm_call_seconds.observe(elapsed_ms / 1000, prompt_name, model, outcome)
+        breaker = self._breaker(route.provider)
+        if outcome == "cancelled":
+            # Abandoned by the caller (disconnect, lost hedge): says nothing about the provider
+            breaker.cancelled()
+            return
+        ok = outcome == "ok"
+        breaker.record(ok)
+        self.latency[prompt_name].record(elapsed_ms, ok)
+        if outcome == "timeout":
+            self.timeouts += 1
+        if not ok:
+            llm_call_errors.inc(prompt_name, model, outcome)
+            logger.warning(f"LLM call '{prompt_name}' ({model}) {outcome} after {elapsed_ms:.0f}ms")
+
+    def stats(self) -> dict:
+        return {
+            "routes": self.router.stats(),
+            "scheduler": self.scheduler.stats(),
+            "breakers": {provider: breaker.stats() for provider, breaker in self.breakers.items()},
+            "timeouts": self.timeouts,
+            "hedges": {"fired": self.hedges, "won": self.hedge_wins},
+            "single_flight": self.flights.stats(),
+            "latency": {name: window.stats() for name, window in self.latency.items()},
+        }
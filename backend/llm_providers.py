@@ -0,0 +1,148 @@
+"""LLM providers and the routing table that picks one per call.
+
+A provider turns a `Route` (provider name + model) into a chat client with
+the LlmChat interface (`send_message`, optionally `stream_message`; the
+emergentintegrations client has no `stream_message`, so its replies are
+never streamed incrementally):
+
+    EmergentProvider   openai / anthropic / gemini through emergentintegrations
+    FakeProvider       offline and deterministic (fake_llm.py), for tests and
+                       benchmarks; selected for every route with LLM_BACKEND=fake
+
+`ModelRouter` evaluates the rules in `data/llm_routes.json` in file order;
+the first rule whose conditions all hold picks the route, otherwise the
+default applies. Conditions:
+
+    prompt      system prompt names (mentor, explain, roadmap)
+    class       scheduling classes (interactive, recommend, bulk)
+    tier        user latency tiers (standard, fast)
+    min_chars / max_chars   bounds on the prompt length
+"""
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_ROUTES_PATH = Path(__file__).parent / "data" / "llm_routes.json"
+
+DEFAULT_TIER = "standard"
+
+
+class Route(NamedTuple):
+    provider: str
+    model: str
+
+    def __str__(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+class EmergentProvider:
+    """Every vendor behind the Emergent universal key; the SDK is imported on first use"""
+
+    vendors = ("openai", "anthropic", "gemini")
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+        self._classes = None
+
+    def new_chat(self, route: Route, session_id: str, system_message: str):
+        if self._classes is None:
+            from emergentintegrations.llm.chat import LlmChat, UserMessage
+            self._classes = LlmChat, UserMessage
+        chat_cls, message_cls = self._classes
+        chat = chat_cls(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(route.provider, route.model)
+        return chat, message_cls
+
+
+class FakeProvider:
+    """Offline stand-in: replies depend only on the prompt, latency is configured by env"""
+
+    def new_chat(self, route: Route, session_id: str, system_message: str):
+        from fake_llm import FakeLlmChat, UserMessage
+        chat = FakeLlmChat(session_id=session_id, system_message=system_message)
+        return chat.with_model(route.provider, route.model), UserMessage
+
+
+def build_providers(api_key: Optional[str], offline: bool = False) -> Dict[str, object]:
+    """Provider name -> provider; offline maps every name to the fake provider"""
+    fake = FakeProvider()
+    online = fake if offline else EmergentProvider(api_key)
+    return {**{vendor: online for vendor in EmergentProvider.vendors}, "fake": fake}
+
+
+class RoutingRule(NamedTuple):
+    name: str
+    prompts: Optional[frozenset]
+    classes: Optional[frozenset]
+    tiers: Optional[frozenset]
+    min_chars: Optional[int]
+    max_chars: Optional[int]
+    route: Route
+
+    def matches(self, prompt_name: str, class_name: str, tier: str, chars: int) -> bool:
+        return (
+            (self.prompts is None or prompt_name in self.prompts)
+            and (self.classes is None or class_name in self.classes)
+            and (self.tiers is None or tier in self.tiers)
+            and (self.min_chars is None or chars >= self.min_chars)
+            and (self.max_chars is None or chars <= self.max_chars)
+        )
+
+
+def _route(spec: dict) -> Route:
+    return Route(spec["provider"], spec["model"])
+
+
+def _names(values) -> Optional[frozenset]:
+    return frozenset(values) if values is not None else None
+
+
+class ModelRouter:
+    def __init__(self, config: dict):
+        self.default = _route(config["default"])
+        self.rules: List[RoutingRule] = []
+        for rule in config.get("rules", []):
+            when = rule.get("when", {})
+            self.rules.append(RoutingRule(
+                name=rule["name"],
+                prompts=_names(when.get("prompt")),
+                classes=_names(when.get("class")),
+                tiers=_names(when.get("tier")),
+                min_chars=when.get("min_chars"),
+                max_chars=when.get("max_chars"),
+                route=_route(rule["route"])
+            ))
+        self.decisions = Counter()
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_ROUTES_PATH) -> "ModelRouter":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def single(cls, provider: str, model: str) -> "ModelRouter":
+        """Every call to one model"""
+        return cls({"default": {"provider": provider, "model": model}})
+
+    def route(self, prompt_name: str, class_name: str, text: str, tier: Optional[str] = None) -> Route:
+        tier = tier or DEFAULT_TIER
+        chars = len(text)
+        for rule in self.rules:
+            if rule.matches(prompt_name, class_name, tier, chars):
+                self.decisions[rule.name] += 1
+                return rule.route
+        self.decisions["default"] += 1
+        return self.default
+
+    def routes(self) -> List[Tuple[str, Route]]:
+        return [(rule.name, rule.route) for rule in self.rules] + [("default", self.default)]
+
+    def stats(self) -> dict:
+        return {
+            name: {"route": str(route), "calls": self.decisions[name]}
+            for name, route in self.routes()
+        }
@@ -0,0 +1,162 @@
+"""Priority admission for outbound LLM calls.
+
+At most `max_concurrency` calls run at once. Calls beyond that wait in a
+heap ordered by class priority (lower first) then arrival, and a freed slot
+is handed straight to the best waiter, so interactive chat overtakes queued
+bulk work instead of sitting behind it.
+
+Each class bounds how long a call may wait (`max_wait`) and how many may
+wait at once (`max_queue`). A call is shed on arrival when its class queue
+is full or when the expected wait, from the calls ahead of it and recent
+call latency, already exceeds its deadline; callers catch `Overloaded` and
+answer with their fallback instead of queueing into a timeout.
+
+Every admission records its wait in the `llm_scheduler_wait_seconds`
+histogram (zero for calls admitted straight away).
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from latency import LatencyWindow
+from metrics import registry
+
+llm_scheduler_wait_seconds = registry.histogram(
+    "llm_scheduler_wait_seconds", "Time LLM calls waited for a scheduler slot, by class and priority",
+    ("class", "priority")
+)
+
+
+class PriorityClass(NamedTuple):
+    priority: int
+    max_wait: float  # seconds
+    max_queue: int
+
+
+class Overloaded(Exception):
+    def __init__(self, class_name: str, reason: str):
+        super().__init__(f"LLM {class_name} call shed: {reason}")
+        self.class_name = class_name
+        self.reason = reason
+
+
+class _ClassStats:
+    def __init__(self):
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_expected_wait = 0
+        self.expired = 0
+        self.wait = LatencyWindow()
+
+
+class PriorityScheduler:
+    def __init__(self, max_concurrency: int, classes: Dict[str, PriorityClass]):
+        self.max_concurrency = max_concurrency
+        self.classes = classes
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._heap: List[list] = []
+        self._seq = itertools.count()
+        self._stats = {name: _ClassStats() for name in classes}
+        # Recent service time of admitted calls, for the expected-wait estimate
+        self.service = LatencyWindow(size=128)
+
+    @property
+    def waiting(self) -> int:
+        return sum(s.waiting for s in self._stats.values())
+
+    def _ahead_of(self, priority: int) -> int:
+        return sum(s.waiting for name, s in self._stats.items() if self.classes[name].priority <= priority)
+
+    async def acquire(self, class_name: str, max_wait: Optional[float] = None):
+        """Wait for a slot; raises Overloaded if the call is shed or its deadline passes"""
+        cls = self.classes[class_name]
+        stats = self._stats[class_name]
+        max_wait = cls.max_wait if max_wait is None else max_wait
+        if self.in_flight < self.max_concurrency and not self.waiting:
+            self._admit(class_name, 0.0)
+            return
+
+        if stats.waiting >= cls.max_queue:
+            stats.shed_queue_full += 1
+            raise Overloaded(class_name, "queue full")
+        ahead = self._ahead_of(cls.priority)
+        expected_wait = (ahead + 1) / self.max_concurrency * self.service.percentile(0.5) / 1000
+        if expected_wait > max_wait:
+            stats.shed_expected_wait += 1
+            raise Overloaded(class_name, f"expected wait {expected_wait:.1f}s")
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, [cls.priority, next(self._seq), future, class_name])
+        stats.waiting += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max_wait)
+        except BaseException as e:
+            handed_over = future.done() and not future.cancelled()
+            if not handed_over:
+                # Give up the place in line; the heap entry stays behind as a tombstone
+                future.cancel()
+                stats.waiting -= 1
+                if isinstance(e, asyncio.TimeoutError):
+                    stats.expired += 1
+                    raise Overloaded(class_name, f"waited {max_wait:.1f}s") from None
+                raise
+            if not isinstance(e, asyncio.TimeoutError):
+                # Cancelled just as the slot arrived: pass it on
+                self.release()
+                raise
+        self._admit(class_name, (time.perf_counter() - started) * 1000, handed_over=True)
+
+    def try_acquire(self, class_name: str) -> bool:
+        """Take a slot only if one is free right now, without queueing"""
+        if self.in_flight < self.max_concurrency and not self.waiting:
+            self._admit(class_name, 0.0)
+            return True
+        return False
+
+    def _admit(self, class_name: str, waited_ms: float, handed_over: bool = False):
+        if not handed_over:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        stats = self._stats[class_name]
+        stats.admitted += 1
+        stats.wait.record(waited_ms)
+        llm_scheduler_wait_seconds.observe(waited_ms / 1000, class_name, str(self.classes[class_name].priority))
+
+    def release(self, service_ms: Optional[float] = None):
+        if service_ms is not None:
+            self.service.record(service_ms)
+        while self._heap:
+            _, _, future, class_name = heapq.heappop(self._heap)
+            if future.done():
+                continue  # tombstone of a waiter that gave up
+            # The slot passes directly to this waiter; in_flight is unchanged
+            self._stats[class_name].waiting -= 1
+            future.set_result(True)
+            return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "waiting": self.waiting,
+            "classes": {
+                name: {
+                    "priority": self.classes[name].priority,
+                    "waiting": s.waiting,
+                    "admitted": s.admitted,
+                    "shed_queue_full": s.shed_queue_full,
+                    "shed_expected_wait": s.shed_expected_wait,
+                    "expired": s.expired,
+                    "wait_p50_ms": round(s.wait.percentile(0.50), 1),
+                    "wait_p95_ms": round(s.wait.percentile(0.95), 1),
+                }
+                for name, s in self._stats.items()
+            },
+        }
@@ -0,0 +1,250 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are recorded without locks. Each series keeps one
+shard per recording thread (the event loop, plus Motor's executor threads
+for command monitoring), and a shard is only ever written by its own
+thread, so increments cannot race; shards are summed when `/metrics` is
+scraped. Histogram buckets are preallocated per shard and an observation is
+a bisect plus two additions.
+
+Values that already live elsewhere (cache counters, queue depths) are
+exported through scrape-time callbacks instead of being recorded twice.
+"""
+import time
+from bisect import bisect_left
+from threading import get_ident
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # label values -> thread id -> shard
+        self._series: Dict[tuple, Dict[int, list]] = {}
+
+    def _shard(self, labelvalues: tuple) -> list:
+        shards = self._series.get(labelvalues)
+        if shards is None:
+            shards = self._series.setdefault(labelvalues, {})
+        shard = shards.get(get_ident())
+        if shard is None:
+            shard = shards.setdefault(get_ident(), self._new_shard())
+        return shard
+
+    def _new_shard(self) -> list:
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_shard(self) -> list:
+        return [0.0]
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        self._shard(labelvalues)[0] += amount
+
+    def samples(self) -> Iterable[Sample]:
+        for labelvalues, shards in list(self._series.items()):
+            total = sum(shard[0] for shard in list(shards.values()))
+            yield self.name + "_total", dict(zip(self.labelnames, labelvalues)), total
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_shard(self) -> list:
+        # One slot per bound, one for +Inf, then the running sum
+        return [0] * (len(self.bounds) + 1) + [0.0]
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard(labelvalues)
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        width = len(self.bounds) + 1
+        for labelvalues, shards in list(self._series.items()):
+            counts = [0] * width
+            total = 0.0
+            for shard in list(shards.values()):
+                for i in range(width):
+                    counts[i] += shard[i]
+                total += shard[-1]
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                yield self.name + "_bucket", {**labels, "le": _number(bound)}, cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, cumulative
+
+
+class CallbackMetric:
+    """Samples produced at scrape time by `fn`, as {label values tuple: value}"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 fn: Callable[[], Dict[tuple, float]], kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> Iterable[Sample]:
+        suffix = "_total" if self.kind == "counter" else ""
+        for labelvalues, value in self.fn().items():
+            yield self.name + suffix, dict(zip(self.labelnames, labelvalues)), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                 fn: Callable[[], Dict[tuple, float]], kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, fn, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ==================== HTTP ====================
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing each request under its route template.
+
+    The template (e.g. /api/roadmap/{roadmap_id}) is read from the route
+    FastAPI stores in the scope once routing has happened, so path
+    parameters do not multiply series. Streaming responses are timed until
+    their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - started,
+                scope["method"], getattr(route, "path", "unmatched"), str(status[0])
+            )
+
+
+# ==================== MONGODB ====================
+
+mongo_command_seconds = registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command",
+    ("collection", "command")
+)
+mongo_command_failures = registry.counter(
+    "mongodb_command_failures", "Failed MongoDB commands by collection and command", ("collection", "command")
+)
+
+
+def command_collection(event) -> str:
+    """Collection a started command targets, or '-' for database-level commands"""
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else "-"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """PyMongo command listener; pass it to the client via `event_listeners`.
+
+    Completion events carry the duration but not the command document, so
+    the collection name is remembered from the started event.
+    """
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def _collection(self, event) -> str:
+        return self._collections.pop((event.connection_id, event.request_id), "-")
+
+    def succeeded(self, event):
+        mongo_command_seconds.observe(event.duration_micros / 1e6, self._collection(event), event.command_name)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_command_failures.inc(collection, event.command_name)
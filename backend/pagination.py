@@ -0,0 +1,61 @@
+"""Keyset pagination helpers for chat messages ordered by (timestamp, message_id)."""
+import base64
+import json
+from typing import List, Optional, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(message_doc: dict) -> str:
+    raw = json.dumps([message_doc["timestamp"], message_doc["message_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, message_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if not isinstance(timestamp, str) or not isinstance(message_id, str):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return timestamp, message_id
+
+
+def _key(message_doc: dict) -> Tuple[str, str]:
+    return message_doc["timestamp"], message_doc["message_id"]
+
+
+def in_range(message_doc: dict, before: Optional[str] = None, after: Optional[str] = None) -> bool:
+    """Python equivalent of keyset_filter for documents not yet in Mongo"""
+    key = _key(message_doc)
+    if after and not key > decode_cursor(after):
+        return False
+    if before and not key < decode_cursor(before):
+        return False
+    return True
+
+
+def merge_messages(messages: List[dict], extra: List[dict], descending: bool = False) -> List[dict]:
+    """Merge two message lists in keyset order, dropping duplicate message_ids"""
+    merged = {m["message_id"]: m for m in messages}
+    for m in extra:
+        merged.setdefault(m["message_id"], m)
+    return sorted(merged.values(), key=_key, reverse=descending)
+
+
+def keyset_filter(before: Optional[str] = None, after: Optional[str] = None) -> dict:
+    """Mongo filter selecting messages strictly before and/or after the cursors"""
+    clauses = []
+    for cursor, op in ((after, "$gt"), (before, "$lt")):
+        if cursor:
+            timestamp, message_id = decode_cursor(cursor)
+            clauses.append({"$or": [
+                {"timestamp": {op: timestamp}},
+                {"timestamp": timestamp, "message_id": {op: message_id}},
+            ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
@@ -0,0 +1,165 @@
+"""Per-user token buckets for LLM-backed endpoints.
+
+Each limit is a bucket of `capacity` tokens refilled continuously at
+`capacity / period` tokens per second; a request spends one token or is
+refused with the number of seconds until one is available.
+
+`MemoryBuckets` keeps buckets in a dict and is the default: a check is a
+dict lookup and a little float arithmetic. With several workers each one
+enforces the limit separately, so `MongoBuckets` can be used instead to
+share buckets through one atomic pipeline update per request.
+
+Limits are configured as `name=capacity/seconds` pairs, e.g.
+
+    RATE_LIMITS="chat=20/60,roadmap=5/600,explain=10/300"
+"""
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class Limit(NamedTuple):
+    capacity: float
+    period: float  # seconds to refill an empty bucket
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+DEFAULT_LIMITS = {
+    "chat": Limit(20, 60),
+    "roadmap": Limit(5, 600),
+    "explain": Limit(10, 300),
+}
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """'chat=20/60,roadmap=5/600' -> {'chat': Limit(20, 60), ...}
+
+    Malformed items (e.g. 'chat=20', 'chat=0/60') are logged and skipped, so
+    a typo in RATE_LIMITS leaves that route on its default limit instead of
+    stopping the server at import.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        capacity, _, period = value.partition("/")
+        try:
+            limit = Limit(float(capacity), float(period))
+        except ValueError:
+            limit = None
+        valid = limit is not None and all(0 < v < math.inf for v in limit)
+        if not name.strip() or not valid:
+            logger.warning(f"Ignoring malformed rate limit '{item}', expected name=capacity/seconds")
+            continue
+        limits[name.strip()] = limit
+    return limits
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Rate limit '{name}' exceeded, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class MemoryBuckets:
+    """Buckets for this process only; idle full buckets are pruned when the table grows"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # (name, key) -> [tokens, last refill, period]
+        self._buckets: Dict[tuple, list] = {}
+
+    async def take(self, name: str, key: str, limit: Limit) -> float:
+        return self.take_now(name, key, limit, time.monotonic())
+
+    def take_now(self, name: str, key: str, limit: Limit, now: float) -> float:
+        bucket = self._buckets.get((name, key))
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[(name, key)] = [limit.capacity, now, limit.period]
+        tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / limit.rate
+
+    def _prune(self, now: float):
+        # A bucket untouched for its whole period is full again and can be forgotten
+        self._buckets = {k: b for k, b in self._buckets.items() if now - b[1] < b[2]}
+
+
+class MongoBuckets:
+    """Buckets shared by every worker through one collection.
+
+    The refill, the spend and the decision happen in a single
+    find_one_and_update with a pipeline update (MongoDB 4.2+), so concurrent
+    requests from different workers cannot spend the same token. Documents
+    carry `expires_at` for a TTL index once the bucket would be full again.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, name: str, key: str, limit: Limit) -> float:
+        now = datetime.now(timezone.utc)
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [
+            limit.capacity,
+            {"$add": [{"$ifNull": ["$tokens", limit.capacity]}, {"$multiply": [elapsed, limit.rate]}]}
+        ]}
+        doc = await self.collection.find_one_and_update(
+            {"bucket": name, "key": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": now + timedelta(seconds=limit.period),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"_id": 0, "allowed": 1, "tokens": 1}
+        )
+        if doc["allowed"]:
+            return 0.0
+        return (1 - doc["tokens"]) / limit.rate
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Limit], backend=None):
+        self.limits = limits
+        self.backend = backend or MemoryBuckets()
+        self.allowed = 0
+        self.denied = 0
+
+    async def check(self, name: str, key: str):
+        """Spend one token from `key`'s bucket for `name`; raises RateLimitExceeded"""
+        limit = self.limits.get(name)
+        if limit is None:
+            return
+        retry_after = await self.backend.take(name, key, limit)
+        if retry_after:
+            self.denied += 1
+            raise RateLimitExceeded(name, retry_after)
+        self.allowed += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "limits": {name: f"{limit.capacity:g}/{limit.period:g}s" for name, limit in self.limits.items()},
+            "allowed": self.allowed,
+            "denied": self.denied,
+        }
@@ -0,0 +1,103 @@
+"""Shared cache of generated roadmap content.
+
+Roadmap prompts depend only on the career title and experience level, so the
+generated text is shared across users. Lookups go to an in-memory TTLCache
+first and then to the `roadmap_cache` Mongo collection, which is bounded by
+entry TTL and a maximum entry count (least recently used entries go first).
+"""
+import re
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from ttl_cache import TTLCache
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def roadmap_cache_key(career_title: str, experience_level: str) -> str:
+    """Normalized key: case- and whitespace-insensitive title and level"""
+    title = _WHITESPACE.sub(" ", career_title).strip().lower()
+    level = _WHITESPACE.sub(" ", experience_level).strip().lower()
+    return f"{title}|{level}"
+
+
+class RoadmapCache:
+    def __init__(self, collection, ttl: float = 7 * 24 * 3600, max_entries: int = 5000,
+                 memory_size: int = 500, memory_ttl: float = 600):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = TTLCache(maxsize=memory_size, ttl=memory_ttl)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        now = datetime.now(timezone.utc)
+        # Read and bump recency in a single round trip
+        doc = await self.collection.find_one_and_update(
+            {"cache_key": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}, "$inc": {"hits": 1}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(doc)
+        return doc
+
+    async def put(self, key: str, career_title: str, experience_level: str, content: str, **extra) -> dict:
+        now = datetime.now(timezone.utc)
+        doc = {
+            "cache_key": key,
+            "career_title": career_title,
+            "experience_level": experience_level,
+            "content": content,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl),
+            **extra
+        }
+        await self.collection.update_one(
+            {"cache_key": key},
+            {"$set": doc, "$setOnInsert": {"hits": 0}},
+            upsert=True
+        )
+        self._remember(doc)
+        await self._trim()
+        return doc
+
+    def _remember(self, doc: dict):
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        self.memory.set(doc["cache_key"], doc, ttl=remaining)
+
+    async def _trim(self):
+        """Evict least recently used entries beyond max_entries"""
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = await self.collection.find(
+            {}, {"_id": 1}
+        ).sort("last_used_at", 1).limit(excess).to_list(excess)
+        await self.collection.delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+        }
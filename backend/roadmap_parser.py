@@ -0,0 +1,125 @@
+"""Structured steps from LLM roadmap text.
+
+The roadmap prompt asks for
+
+    Step 1: [Title]
+    Duration: [X weeks/months]
+    Description of what to learn and do
+    • Key skill 1
+
+and this module turns that text into validated `RoadmapStep`s once, when the
+roadmap is saved. Durations are normalised to weeks (ranges take the upper
+bound) so plan length can be summed or queried without re-parsing. Text that
+yields no steps is stored unparsed and the client falls back to rendering the
+raw content.
+"""
+import logging
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Same step headers the roadmap page has always recognised, plus "Step N" /
+# "Phase N" written as list items ("- **Step 1: ...**")
+_STEP_HEADER = re.compile(
+    r"^(?:[•\-*]\s*(?=(?:Step|Phase)\s+\d))?(Step\s+\d+|Phase\s+\d+|\d+\.|#\s*\d+)[:\s.)-]*",
+    re.IGNORECASE
+)
+_MARKDOWN = re.compile(r"^#{1,6}\s+|\*\*|__")
+_DURATION_LABEL = re.compile(r"^(?:Duration|Timeframe|Time)\s*:\s*", re.IGNORECASE)
+_DURATION = re.compile(
+    r"(\d+(?:\.\d+)?)(?:\s*(?:-|–|to)\s*(\d+(?:\.\d+)?))?\s*(day|week|month|year)s?",
+    re.IGNORECASE
+)
+_BULLET = re.compile(r"^[•\-*]\s*")
+
+WEEKS_PER_UNIT = {"day": 1 / 7, "week": 1.0, "month": 52 / 12, "year": 52.0}
+
+
+class RoadmapStep(BaseModel):
+    title: str = Field(min_length=1, max_length=200)
+    duration: Optional[str] = None
+    duration_weeks: Optional[float] = Field(default=None, ge=0)
+    description: str = ""
+    skills: List[str] = []
+
+
+class ParsedRoadmap(BaseModel):
+    steps: List[RoadmapStep] = Field(min_length=1)
+    total_weeks: Optional[float] = None
+
+
+class RoadmapParseError(ValueError):
+    pass
+
+
+def parse_duration_weeks(text: str) -> Optional[float]:
+    """'6 weeks' -> 6.0, '1-2 months' -> 8.7, None when no duration is found"""
+    match = _DURATION.search(text or "")
+    if not match:
+        return None
+    amount = float(match.group(2) or match.group(1))
+    return round(amount * WEEKS_PER_UNIT[match.group(3).lower()], 1)
+
+
+def parse_roadmap(content: str) -> ParsedRoadmap:
+    """Parse roadmap text; raises RoadmapParseError if it has no usable steps"""
+    steps = []
+    current = None
+    for raw in (content or "").splitlines():
+        line = _MARKDOWN.sub("", raw.strip()).strip()
+        if not line:
+            continue
+        header = _STEP_HEADER.match(line)
+        if header:
+            title = line[header.end():].strip() or header.group(1)
+            inline = _DURATION.search(title)  # "SQL (1 month)"
+            current = {"title": title, "duration": inline.group(0) if inline else None,
+                       "description": [], "skills": []}
+            steps.append(current)
+            continue
+        if current is None:
+            continue  # preamble before the first step
+        label = _DURATION_LABEL.match(line)
+        if label:
+            current["duration"] = line[label.end():].strip()
+        elif _BULLET.match(line):
+            current["skills"].append(_BULLET.sub("", line))
+        else:
+            if current["duration"] is None and _DURATION.search(line):
+                current["duration"] = _DURATION.search(line).group(0)
+            current["description"].append(line)
+
+    if not steps:
+        raise RoadmapParseError("no step headers found")
+    try:
+        parsed = [
+            RoadmapStep(
+                title=step["title"],
+                duration=step["duration"],
+                duration_weeks=parse_duration_weeks(step["duration"]),
+                description=" ".join(step["description"]),
+                skills=step["skills"]
+            )
+            for step in steps
+        ]
+        weeks = [step.duration_weeks for step in parsed if step.duration_weeks is not None]
+        return ParsedRoadmap(steps=parsed, total_weeks=round(sum(weeks), 1) if weeks else None)
+    except ValidationError as e:
+        raise RoadmapParseError(str(e)) from e
+
+
+def structure_roadmap(content: str) -> dict:
+    """Fields to store on a roadmap document; never raises"""
+    try:
+        parsed = parse_roadmap(content)
+    except RoadmapParseError as e:
+        logger.warning(f"Roadmap left unstructured: {e}")
+        return {"steps": [], "total_weeks": None, "parse_status": "unparsed"}
+    return {
+        "steps": [step.model_dump() for step in parsed.steps],
+        "total_weeks": parsed.total_weeks,
+        "parse_status": "parsed",
+    }
@@ -0,0 +1,57 @@
+"""Derived fields for saved roadmaps.
+
+Saved roadmaps carry the full LLM text in `content`. When a roadmap is
+written, the parsed steps (see roadmap_parser) and a small list summary
+(`step_count`, `preview`) are stored alongside it, so `/roadmap/list` can
+project away `content` and transfer a few hundred bytes per roadmap. Full
+documents are fetched by id, one at a time or in a batch.
+"""
+import logging
+
+from pymongo import UpdateOne
+
+from roadmap_parser import structure_roadmap
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 160
+
+SUMMARY_PROJECTION = {
+    "_id": 0,
+    "roadmap_id": 1,
+    "career_title": 1,
+    "description": 1,
+    "experience_level": 1,
+    "created_at": 1,
+    "step_count": 1,
+    "total_weeks": 1,
+    "preview": 1,
+}
+
+
+def derive_roadmap_fields(content: str) -> dict:
+    """Structured steps, total_weeks, parse_status, step_count and preview"""
+    fields = structure_roadmap(content)
+    if fields["steps"]:
+        step_count = len(fields["steps"])
+    else:
+        # Unparsed roadmaps render as one phase per paragraph, at most six
+        step_count = min(6, len([p for p in (content or "").split("\n\n") if p.strip()]))
+    preview = " ".join((content or "").split())[:PREVIEW_LENGTH]
+    return {**fields, "step_count": step_count, "preview": preview}
+
+
+async def backfill_roadmaps(db, batch_size: int = 500) -> int:
+    """Parse and summarize roadmaps saved before these fields existed"""
+    written = 0
+    batch = []
+    cursor = db.roadmaps.find({"parse_status": {"$exists": False}}, {"_id": 1, "content": 1})
+    async for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": derive_roadmap_fields(doc.get("content", ""))}))
+        if len(batch) >= batch_size:
+            written += (await db.roadmaps.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        written += (await db.roadmaps.bulk_write(batch, ordered=False)).modified_count
+    logger.info(f"Backfilled structured fields on {written} roadmaps")
+    return written
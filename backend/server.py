@@ -1,9 +1,14 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Cookie
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import json
+import asyncio
+import math
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
@@ -11,14 +16,33 @@ from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import httpx
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from ttl_cache import TTLCache
+from roadmap_cache import RoadmapCache, roadmap_cache_key
+from llm_gateway import LlmGateway
+from llm_providers import DEFAULT_ROUTES_PATH, ModelRouter
+from llm_scheduler import Overloaded
+from db_maintenance import ensure_indexes
+from conversations import record_conversation_turn, list_conversations
+from user_stats import get_user_stats, increment_user_stats
+from roadmaps import SUMMARY_PROJECTION, derive_roadmap_fields
+from job_queue import JobQueue, public_job
+from rate_limit import DEFAULT_LIMITS, MongoBuckets, RateLimiter, RateLimitExceeded, parse_limits
+from pagination import InvalidCursor, encode_cursor, in_range, keyset_filter, merge_messages
+from write_behind import WriteBehindQueue
+from career_catalog import CareerCatalog, DEFAULT_CATALOG_PATH
+from career_ranker import PROFILE_FIELDS, CareerRanker
+from chat_rules import ChatRuleEngine, DEFAULT_RULES_PATH
+from chat_context import ChatContext, ContextBuilder
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MongoCommandMetrics, RequestMetricsMiddleware, registry
+from tracing import JsonlExporter, MongoCommandTracing, OtlpExporter, TracingMiddleware, span
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Command monitoring feeds per-collection timings into /metrics and request traces
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics(), MongoCommandTracing()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -34,6 +58,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Session token -> (User, expires_at). Entries never outlive the session itself,
+# and the TTL bounds how long a session deleted by another worker stays valid here.
+session_cache = TTLCache(
+    maxsize=int(os.environ.get('SESSION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('SESSION_CACHE_TTL', 300))
+)
+
+# Chat messages are written in batches off the request path; see write_behind.py.
+# The unflushed overlay is per process, so read-your-writes assumes one worker.
+message_writer = WriteBehindQueue(
+    db.chat_messages,
+    key_field="message_id",
+    group_fields=("user_id", "conversation_id"),
+    max_batch=int(os.environ.get('MESSAGE_WRITE_BATCH', 100)),
+    flush_interval=float(os.environ.get('MESSAGE_WRITE_INTERVAL', 0.05))
+)
+
+# Prompt assembly for mentor chat: recent turns within a token budget plus a rolling summary
+context_builder = ContextBuilder(
+    token_budget=int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', 3000)),
+    summary_tokens=int(os.environ.get('CHAT_SUMMARY_TOKEN_BUDGET', 500))
+)
+
+# All LLM calls go through one gateway (system prompts, model routing, priority
+# scheduling, deadline budgets, circuit breakers, latency stats). The routing
+# table picks provider and model per prompt, prompt length and user latency
+# tier. LLM_HEDGE_CHAT=1 sends a second chat attempt when the first is slower
+# than the recent p95.
+llm = LlmGateway(
+    api_key=os.environ.get('EMERGENT_LLM_KEY'),
+    router=ModelRouter.from_file(Path(os.environ.get('LLM_ROUTES_PATH', DEFAULT_ROUTES_PATH))),
+    max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', 32)),
+    hedge_prompts=("mentor",) if os.environ.get('LLM_HEDGE_CHAT') == '1' else ()
+)
+
+# Generated roadmap content shared across users, keyed by career title + level
+roadmap_cache = RoadmapCache(
+    db.roadmap_cache,
+    ttl=float(os.environ.get('ROADMAP_CACHE_TTL', 7 * 24 * 3600)),
+    max_entries=int(os.environ.get('ROADMAP_CACHE_MAX_ENTRIES', 5000))
+)
+
+# Per-user token buckets on LLM-backed routes. Buckets live in this process
+# unless RATE_LIMIT_BACKEND=mongo shares them between workers.
+rate_limiter = RateLimiter(
+    {**DEFAULT_LIMITS, **parse_limits(os.environ.get('RATE_LIMITS', ''))},
+    backend=MongoBuckets(db.rate_limits) if os.environ.get('RATE_LIMIT_BACKEND') == 'mongo' else None
+)
+
+# Request tracing: every response carries a Server-Timing summary of its
+# phases; TRACE_SAMPLE_RATE of requests are also exported span by span to an
+# OTLP/HTTP collector (TRACE_OTLP_ENDPOINT) or a JSONL file (TRACE_JSONL_PATH).
+if os.environ.get('TRACE_OTLP_ENDPOINT'):
+    trace_exporter = OtlpExporter(os.environ['TRACE_OTLP_ENDPOINT'])
+elif os.environ.get('TRACE_JSONL_PATH'):
+    trace_exporter = JsonlExporter(os.environ['TRACE_JSONL_PATH'])
+else:
+    trace_exporter = None
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.01))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+
 # ==================== MODELS ====================
 
 class User(BaseModel):
@@ -43,13 +128,15 @@ class User(BaseModel):
     name: str
     picture: Optional[str] = None
     created_at: str
+    # LLM routing tier ("standard" when unset); "fast" may route chat to a smaller model
+    latency_tier: Optional[str] = None
 
 class UserSession(BaseModel):
     model_config = ConfigDict(extra="ignore")
     user_id: str
     session_token: str
-    expires_at: str
-    created_at: str
+    expires_at: datetime
+    created_at: datetime
 
 class ChatMessage(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -64,6 +151,8 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
 
 class McqQuestion(BaseModel):
+    # Prebuilt by the chat rule engine and shared between responses
+    model_config = ConfigDict(frozen=True)
     question: str
     options: List[str]
     type: str  # 'single' or 'multiple'
@@ -95,10 +184,36 @@ class Roadmap(BaseModel):
     resources: List[dict]
     created_at: str
 
+class RoadmapBatchRequest(BaseModel):
+    roadmap_ids: List[str] = Field(min_length=1, max_length=50)
+
 # ==================== AUTH HELPER ====================
 
+def _parse_expiry(expires_at) -> datetime:
+    """Normalize a stored expires_at (ISO string or datetime) to an aware datetime"""
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at)
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at
+
+def _user_from_doc(user_doc: dict) -> User:
+    # Convert datetime to string if needed
+    if isinstance(user_doc.get("created_at"), datetime):
+        user_doc["created_at"] = user_doc["created_at"].isoformat()
+    return User(**user_doc)
+
+def cache_session(token: str, user: User, expires_at: datetime):
+    """Remember a validated session until it expires (capped by the cache TTL)"""
+    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    session_cache.set(token, (user, expires_at), ttl=remaining)
+
 async def get_current_user(request: Request, session_token: Optional[str] = Cookie(None)) -> User:
     """Authenticator helper - checks cookie first, then Authorization header"""
+    with span("auth"):
+        return await _authenticate(request, session_token)
+
+async def _authenticate(request: Request, session_token: Optional[str]) -> User:
     token = session_token
     
     # Fallback to Authorization header
@@ -110,6 +225,15 @@ async def get_current_user(request: Request, session_token: Optional[str] = Cook
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    # Serve from the session cache when possible
+    cached = session_cache.get(token)
+    if cached:
+        user, expires_at = cached
+        if expires_at < datetime.now(timezone.utc):
+            session_cache.pop(token)
+            raise HTTPException(status_code=401, detail="Session expired")
+        return user
+    
     # Find session in database
     session_doc = await db.user_sessions.find_one(
         {"session_token": token},
@@ -120,11 +244,7 @@ async def get_current_user(request: Request, session_token: Optional[str] = Cook
         raise HTTPException(status_code=401, detail="Invalid session")
     
     # Check expiry with timezone awareness
-    expires_at = session_doc["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    expires_at = _parse_expiry(session_doc["expires_at"])
     if expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=401, detail="Session expired")
     
@@ -137,14 +257,52 @@ async def get_current_user(request: Request, session_token: Optional[str] = Cook
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Convert datetime to string if needed
-    if isinstance(user_doc.get("created_at"), datetime):
-        user_doc["created_at"] = user_doc["created_at"].isoformat()
-    
-    return User(**user_doc)
+    user = _user_from_doc(user_doc)
+    cache_session(token, user, expires_at)
+    return user
 
 # ==================== AUTH ROUTES ====================
 
+AUTH_SESSION_URL = os.environ.get(
+    'AUTH_SESSION_URL',
+    "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"
+)
+
+auth_http: Optional[httpx.AsyncClient] = None
+
+def get_auth_http() -> httpx.AsyncClient:
+    """Shared pooled client for the auth provider, opened with the app"""
+    global auth_http
+    if auth_http is None or auth_http.is_closed:
+        auth_http = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+        )
+    return auth_http
+
+async def upsert_user(auth_data: dict) -> dict:
+    """Update name/picture of the user with this email, creating them if needed"""
+    for attempt in range(2):
+        try:
+            return await db.users.find_one_and_update(
+                {"email": auth_data["email"]},
+                {
+                    "$set": {"name": auth_data["name"], "picture": auth_data["picture"]},
+                    # email is copied from the filter on insert
+                    "$setOnInsert": {
+                        "user_id": f"user_{uuid.uuid4().hex[:12]}",
+                        "created_at": datetime.now(timezone.utc).isoformat()
+                    }
+                },
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent login inserted the same email first; the retry matches it
+            if attempt:
+                raise
+
 @api_router.post("/auth/session")
 async def create_session(request: Request, response: Response):
     """Process session_id from Emergent Auth"""
@@ -155,59 +313,37 @@ async def create_session(request: Request, response: Response):
         if not session_id:
             raise HTTPException(status_code=400, detail="session_id required")
         
-        # Call Emergent Auth API
-        async with httpx.AsyncClient() as client:
-            auth_response = await client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": session_id}
-            )
-            
-            if auth_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid session_id")
-            
-            auth_data = auth_response.json()
+        # Call Emergent Auth API over the shared keep-alive client
+        auth_response = await get_auth_http().get(
+            AUTH_SESSION_URL,
+            headers={"X-Session-ID": session_id}
+        )
         
-        # Generate user_id
-        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        if auth_response.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid session_id")
         
-        # Check if user exists by email
-        existing_user = await db.users.find_one(
-            {"email": auth_data["email"]},
-            {"_id": 0}
-        )
+        auth_data = auth_response.json()
         
-        if existing_user:
-            user_id = existing_user["user_id"]
-            # Update user data
-            await db.users.update_one(
-                {"user_id": user_id},
-                {"$set": {
-                    "name": auth_data["name"],
-                    "picture": auth_data["picture"]
-                }}
-            )
-        else:
-            # Create new user
-            user_doc = {
-                "user_id": user_id,
-                "email": auth_data["email"],
-                "name": auth_data["name"],
-                "picture": auth_data["picture"],
-                "created_at": datetime.now(timezone.utc).isoformat()
-            }
-            await db.users.insert_one(user_doc)
+        # Create or update the user by email in a single round trip
+        user = await upsert_user(auth_data)
+        user_id = user["user_id"]
         
         # Create session
         session_token = auth_data["session_token"]
         expires_at = datetime.now(timezone.utc) + timedelta(days=7)
         
+        # Stored as BSON dates so the TTL index can expire them
         session_doc = {
             "user_id": user_id,
             "session_token": session_token,
-            "expires_at": expires_at.isoformat(),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "expires_at": expires_at,
+            "created_at": datetime.now(timezone.utc)
         }
-        await db.user_sessions.insert_one(session_doc)
+        await db.user_sessions.update_one(
+            {"session_token": session_token},
+            {"$set": session_doc},
+            upsert=True
+        )
         
         # Set httpOnly cookie
         response.set_cookie(
@@ -221,9 +357,11 @@ async def create_session(request: Request, response: Response):
         )
         
         # Return user data
-        user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+        cache_session(session_token, _user_from_doc(dict(user)), expires_at)
         return {"user": user, "session_token": session_token}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Session creation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -238,6 +376,7 @@ async def get_me(request: Request, session_token: Optional[str] = Cookie(None)):
 async def logout(request: Request, response: Response, session_token: Optional[str] = Cookie(None)):
     """Logout user"""
     if session_token:
+        session_cache.pop(session_token)
         await db.user_sessions.delete_one({"session_token": session_token})
     
     response.delete_cookie(key="session_token", path="/")
@@ -245,6 +384,66 @@ async def logout(request: Request, response: Response, session_token: Optional[s
 
 # ==================== CHAT ROUTES ====================
 
+# MCQ / suggested-option rules, compiled once from data/chat_rules.json
+chat_rules = ChatRuleEngine.from_file(
+    Path(os.environ.get('CHAT_RULES_PATH', DEFAULT_RULES_PATH)),
+    mcq_factory=McqQuestion
+)
+
+CHAT_FALLBACK_RESPONSE = "I'm having trouble connecting right now. Please try again in a moment."
+CHAT_BUSY_RESPONSE = "I'm helping a lot of students right now. Please try again in a few seconds."
+
+async def store_user_message(user: User, conversation_id: str, content: str) -> dict:
+    """Queue the user's message for a batched write"""
+    user_message_doc = {
+        "message_id": f"msg_{uuid.uuid4().hex[:12]}",
+        "user_id": user.user_id,
+        "conversation_id": conversation_id,
+        "role": "user",
+        "content": content,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    message_writer.enqueue(user_message_doc)
+    await increment_user_stats(db, user.user_id, chats=1)
+    return user_message_doc
+
+async def build_chat_context(user: User, conversation_id: str, user_message_doc: dict) -> ChatContext:
+    """Assemble the token-budgeted prompt for this turn and log its size"""
+    context = await context_builder.build(
+        db, user.user_id, conversation_id, user_message_doc["content"],
+        exclude_message_id=user_message_doc["message_id"],
+        pending=message_writer.pending(user.user_id, conversation_id)
+    )
+    logger.info(
+        f"Chat context {conversation_id}: prompt_tokens={context.prompt_tokens} "
+        f"history_turns={context.history_turns} summary_tokens={context.summary_tokens}"
+    )
+    return context
+
+async def store_assistant_message(user: User, conversation_id: str, content: str) -> str:
+    ai_message_id = f"msg_{uuid.uuid4().hex[:12]}"
+    ai_message_doc = {
+        "message_id": ai_message_id,
+        "user_id": user.user_id,
+        "conversation_id": conversation_id,
+        "role": "assistant",
+        "content": content,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    message_writer.enqueue(ai_message_doc)
+    await record_conversation_turn(db, user.user_id, conversation_id, ai_message_doc)
+    return ai_message_id
+
+def select_follow_ups(message: str, conversation: dict):
+    """Pick the MCQ question and suggested options to show after a reply.
+    
+    `conversation` is the summary document as it was before this turn.
+    """
+    user_message_count = conversation.get("user_turn_count", 0) + 1
+    message_count = conversation.get("message_count", 0) + 1
+    mcq_question, suggested_options = chat_rules.select(message, user_message_count, message_count)
+    return mcq_question, list(suggested_options)
+
 @api_router.post("/chat/send", response_model=ChatResponse)
 async def send_chat_message(
     chat_request: ChatRequest,
@@ -253,145 +452,39 @@ async def send_chat_message(
 ):
     """Send a message to AI mentor and get response"""
     user = await get_current_user(request, session_token)
+    with span("ratelimit"):
+        await rate_limiter.check("chat", user.user_id)
     
     # Generate conversation_id if not provided
     conversation_id = chat_request.conversation_id or f"conv_{uuid.uuid4().hex[:12]}"
     
     # Store user message
-    user_message_id = f"msg_{uuid.uuid4().hex[:12]}"
-    user_message_doc = {
-        "message_id": user_message_id,
-        "user_id": user.user_id,
-        "conversation_id": conversation_id,
-        "role": "user",
-        "content": chat_request.message,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-    await db.chat_messages.insert_one(user_message_doc)
-    
-    # Get conversation history
-    history = await db.chat_messages.find(
-        {"user_id": user.user_id, "conversation_id": conversation_id},
-        {"_id": 0}
-    ).sort("timestamp", 1).limit(20).to_list(20)
+    with span("store"):
+        user_message_doc = await store_user_message(user, conversation_id, chat_request.message)
+    with span("context"):
+        context = await build_chat_context(user, conversation_id, user_message_doc)
     
     # Call AI using emergentintegrations
     try:
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY'),
-            session_id=conversation_id,
-            system_message="""You are an expert AI Career Mentor helping students discover careers, 
-            build skills, and create personalized learning roadmaps. Be encouraging, insightful, 
-            and provide actionable advice. When discussing careers, mention required skills, 
-            typical responsibilities, growth potential, and learning resources.
-            
-            After providing your response, if relevant, suggest 2-3 follow-up questions or topics 
-            the user might want to explore. Format these as simple, clear options."""
-        ).with_model("openai", "gpt-5.2")
-        
-        user_msg = UserMessage(text=chat_request.message)
-        ai_response = await chat.send_message(user_msg)
-        
-        # Decide if we should ask an MCQ question
-        mcq_question = None
-        user_message_count = len([m for m in history if m.get('role') == 'user'])
-        
-        # Ask MCQ questions at strategic points in conversation
-        if user_message_count == 1:  # First user message - ask about interests
-            mcq_question = {
-                "question": "What areas interest you the most?",
-                "options": [
-                    "Technology & Software",
-                    "Creative Arts & Design",
-                    "Business & Finance",
-                    "Healthcare & Medicine",
-                    "Education & Teaching",
-                    "Engineering"
-                ],
-                "type": "multiple"
-            }
-        elif user_message_count == 3 and any(word in chat_request.message.lower() for word in ['tech', 'software', 'data', 'ai', 'technology']):
-            mcq_question = {
-                "question": "What's your current experience level?",
-                "options": [
-                    "Complete Beginner",
-                    "Some Basic Knowledge",
-                    "Intermediate (1-2 years)",
-                    "Advanced (3+ years)"
-                ],
-                "type": "single"
-            }
-        elif user_message_count >= 5 and any(word in chat_request.message.lower() for word in ['roadmap', 'learn', 'study', 'path']):
-            mcq_question = {
-                "question": "How much time can you dedicate to learning per week?",
-                "options": [
-                    "1-5 hours",
-                    "5-10 hours",
-                    "10-20 hours",
-                    "20+ hours (Full-time)"
-                ],
-                "type": "single"
-            }
-        elif user_message_count == 2 and any(word in chat_request.message.lower() for word in ['skill', 'learn']):
-            mcq_question = {
-                "question": "Which skills would you like to focus on?",
-                "options": [
-                    "Technical/Hard Skills",
-                    "Soft Skills (Communication, Leadership)",
-                    "Industry-Specific Knowledge",
-                    "Project Management",
-                    "All of the above"
-                ],
-                "type": "multiple"
-            }
+        ai_response = await llm.complete(
+            "mentor", context.prompt, session_id=conversation_id, tier=user.latency_tier
+        )
+        mcq_question, suggested_options = select_follow_ups(chat_request.message, context.conversation)
         
-        # Extract suggested options from AI response if present
+    except Overloaded as e:
+        logger.warning(str(e))
+        ai_response = CHAT_BUSY_RESPONSE
         suggested_options = []
-        if len(history) <= 2 and not mcq_question:  # Only if not showing MCQ
-            # Analyze user's question and provide relevant options
-            message_lower = chat_request.message.lower()
-            if any(word in message_lower for word in ['career', 'job', 'profession', 'what should i']):
-                suggested_options = [
-                    "Tell me about tech careers",
-                    "Show creative career paths",
-                    "Explore business careers"
-                ]
-            elif any(word in message_lower for word in ['skill', 'learn', 'study']):
-                suggested_options = [
-                    "Create a learning roadmap",
-                    "What skills are in-demand?",
-                    "How long does it take?"
-                ]
-            elif any(word in message_lower for word in ['roadmap', 'path', 'steps']):
-                suggested_options = [
-                    "Generate a detailed roadmap",
-                    "Show me example projects",
-                    "Recommend learning resources"
-                ]
-            else:
-                suggested_options = [
-                    "Explore career options",
-                    "Build a skills roadmap",
-                    "Ask about specific careers"
-                ]
-        
+        mcq_question = None
     except Exception as e:
         logger.error(f"AI chat error: {e}")
-        ai_response = "I'm having trouble connecting right now. Please try again in a moment."
+        ai_response = CHAT_FALLBACK_RESPONSE
         suggested_options = []
         mcq_question = None
     
     # Store AI response
-    ai_message_id = f"msg_{uuid.uuid4().hex[:12]}"
-    ai_message_doc = {
-        "message_id": ai_message_id,
-        "user_id": user.user_id,
-        "conversation_id": conversation_id,
-        "role": "assistant",
-        "content": ai_response,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-    await db.chat_messages.insert_one(ai_message_doc)
+    with span("store"):
+        ai_message_id = await store_assistant_message(user, conversation_id, ai_response)
     
     return ChatResponse(
         response=ai_response,
@@ -401,122 +494,243 @@ async def send_chat_message(
         mcq_question=mcq_question
     )
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api_router.post("/chat/stream")
+async def stream_chat_message(
+    chat_request: ChatRequest,
+    request: Request,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Send a message to AI mentor and stream the response as Server-Sent Events.
+    
+    Emits `start` immediately, a `token` event per chunk the provider
+    yields, then a final `done` event carrying message_id, suggested_options
+    and mcq_question. The emergentintegrations client cannot stream, so in
+    production the reply arrives as a single `token` event once it is
+    generated; only the local fake LLM streams word by word.
+    """
+    user = await get_current_user(request, session_token)
+    with span("ratelimit"):
+        await rate_limiter.check("chat", user.user_id)
+    conversation_id = chat_request.conversation_id or f"conv_{uuid.uuid4().hex[:12]}"
+    with span("store"):
+        user_message_doc = await store_user_message(user, conversation_id, chat_request.message)
+    with span("context"):
+        context = await build_chat_context(user, conversation_id, user_message_doc)
+    
+    async def event_stream():
+        chunks = []
+        stored = False
+        try:
+            yield sse_event("start", {"conversation_id": conversation_id})
+            
+            try:
+                async for chunk in llm.stream("mentor", context.prompt, session_id=conversation_id,
+                                              tier=user.latency_tier):
+                    chunks.append(chunk)
+                    yield sse_event("token", {"text": chunk})
+                mcq_question, suggested_options = select_follow_ups(chat_request.message, context.conversation)
+            except Exception as e:
+                fallback = CHAT_BUSY_RESPONSE if isinstance(e, Overloaded) else CHAT_FALLBACK_RESPONSE
+                if isinstance(e, Overloaded):
+                    logger.warning(str(e))
+                else:
+                    logger.error(f"AI chat stream error: {e}")
+                # Replace any partial output with the fallback message
+                chunks = [fallback]
+                yield sse_event("error", {"text": fallback})
+                suggested_options = []
+                mcq_question = None
+            
+            # Persist the assistant message once, after the stream completes
+            stored = True
+            with span("store"):
+                ai_message_id = await asyncio.shield(
+                    store_assistant_message(user, conversation_id, "".join(chunks))
+                )
+            yield sse_event("done", {
+                "conversation_id": conversation_id,
+                "message_id": ai_message_id,
+                "suggested_options": suggested_options,
+                "mcq_question": mcq_question.model_dump() if mcq_question else None
+            })
+        finally:
+            if not stored:
+                # The client disconnected mid-stream. Keep what was generated so
+                # the turn still shows up in /chat/history and matches the counters
+                # the user message already bumped; shielded from the cancellation.
+                await asyncio.shield(store_assistant_message(
+                    user, conversation_id, "".join(chunks) or CHAT_FALLBACK_RESPONSE
+                ))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
 @api_router.get("/chat/history")
 async def get_chat_history(
     request: Request,
     session_token: Optional[str] = Cookie(None),
-    conversation_id: Optional[str] = None
+    conversation_id: Optional[str] = None,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None
 ):
-    """Get chat history for user"""
+    """Get chat history for user.
+    
+    With a conversation_id, messages are paged oldest-first by
+    (timestamp, message_id). Pass the returned `before`/`after` cursors to move
+    backwards/forwards. Sending `Accept: application/x-ndjson` streams the
+    messages one per line instead of returning a page.
+    """
     user = await get_current_user(request, session_token)
     
     if conversation_id:
-        # Get specific conversation
-        messages = await db.chat_messages.find(
-            {"user_id": user.user_id, "conversation_id": conversation_id},
-            {"_id": 0}
-        ).sort("timestamp", 1).to_list(1000)
-        return {"messages": messages}
-    else:
-        # Get all conversations (grouped)
-        pipeline = [
-            {"$match": {"user_id": user.user_id}},
-            {"$sort": {"timestamp": -1}},
-            {"$group": {
-                "_id": "$conversation_id",
-                "last_message": {"$first": "$$ROOT"},
-                "message_count": {"$sum": 1}
-            }},
-            {"$sort": {"last_message.timestamp": -1}},
-            {"$limit": 50}
+        if limit is not None and not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}")
+        try:
+            query = {
+                "user_id": user.user_id,
+                "conversation_id": conversation_id,
+                **keyset_filter(before=before, after=after)
+            }
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Messages accepted but not yet flushed by the write-behind queue
+        pending = [
+            m for m in message_writer.pending(user.user_id, conversation_id)
+            if in_range(m, before=before, after=after)
         ]
-        conversations = await db.chat_messages.aggregate(pipeline).to_list(50)
+        
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                _stream_messages_ndjson(query, limit, pending),
+                media_type="application/x-ndjson"
+            )
+        
+        # Walk backwards from `before` when paging towards older messages
+        page_size = limit or HISTORY_PAGE_SIZE
+        direction = -1 if before and not after else 1
+        messages = await db.chat_messages.find(query, {"_id": 0}).sort(
+            [("timestamp", direction), ("message_id", direction)]
+        ).limit(page_size + 1).to_list(page_size + 1)
+        messages = merge_messages(messages, pending, descending=direction == -1)[:page_size + 1]
+        has_more = len(messages) > page_size
+        messages = messages[:page_size]
+        if direction == -1:
+            messages.reverse()
+        
+        return {
+            "messages": messages,
+            "has_more": has_more,
+            "cursors": {
+                "before": encode_cursor(messages[0]) if messages else before,
+                "after": encode_cursor(messages[-1]) if messages else after
+            }
+        }
+    else:
+        # Get all conversations from the maintained summaries
+        conversations = await list_conversations(db, user.user_id, limit=50)
         return {"conversations": conversations}
 
+async def _stream_messages_ndjson(query: dict, limit: Optional[int], pending: List[dict]):
+    cursor = db.chat_messages.find(query, {"_id": 0}).sort(
+        [("timestamp", 1), ("message_id", 1)]
+    ).batch_size(HISTORY_PAGE_SIZE)
+    if limit:
+        cursor = cursor.limit(limit)
+    sent = 0
+    seen = set()
+    async for message in cursor:
+        seen.add(message["message_id"])
+        sent += 1
+        yield json.dumps(message) + "\n"
+    # Unflushed messages are the newest in the conversation, so they go last
+    for message in merge_messages([], [m for m in pending if m["message_id"] not in seen]):
+        if limit and sent >= limit:
+            break
+        sent += 1
+        yield json.dumps(message) + "\n"
+
 # ==================== CAREER ROUTES ====================
 
+CATALOG_MAX_PAGE_SIZE = 200
+
+career_catalog: Optional[CareerCatalog] = None
+career_ranker: Optional[CareerRanker] = None
+
+async def get_career_catalog() -> CareerCatalog:
+    """Load the catalog once, from Mongo or the bundled JSON file"""
+    global career_catalog
+    if career_catalog is None:
+        if os.environ.get('CAREER_CATALOG_SOURCE', 'file') == 'mongo':
+            career_catalog = await CareerCatalog.from_collection(db.careers)
+        else:
+            career_catalog = CareerCatalog.from_file(
+                Path(os.environ.get('CAREER_CATALOG_PATH', DEFAULT_CATALOG_PATH))
+            )
+        logger.info(f"Loaded career catalog: {len(career_catalog.careers)} careers, version {career_catalog.version}")
+    return career_catalog
+
+async def get_career_ranker() -> CareerRanker:
+    """Similarity matrix over the loaded catalog, built once"""
+    global career_ranker
+    catalog = await get_career_catalog()
+    if career_ranker is None or career_ranker.catalog is not catalog:
+        career_ranker = CareerRanker(catalog)
+    return career_ranker
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 asks for GET): exact tags or `*`"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
 @api_router.get("/careers/explore")
-async def explore_careers(request: Request, session_token: Optional[str] = Cookie(None)):
-    """Get curated career paths across industries"""
+async def explore_careers(
+    request: Request,
+    session_token: Optional[str] = Cookie(None),
+    category: Optional[str] = None,
+    skill: Optional[str] = None,
+    growth: Optional[str] = None,
+    q: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 50
+):
+    """Get curated career paths across industries.
+    
+    Filter by category, skill or growth potential, prefix-search titles with
+    `q`, and page with offset/limit. Responses carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    """
     user = await get_current_user(request, session_token)
     
-    # Curated career data
-    careers = [
-        {
-            "id": "career_1",
-            "title": "Software Engineer",
-            "category": "Technology",
-            "description": "Design, develop, and maintain software applications and systems.",
-            "skills": ["Programming", "Problem Solving", "Algorithms", "Teamwork"],
-            "growth_potential": "High",
-            "avg_salary": "$95,000 - $150,000"
-        },
-        {
-            "id": "career_2",
-            "title": "Data Scientist",
-            "category": "Technology",
-            "description": "Analyze complex data to help companies make better decisions.",
-            "skills": ["Python", "Statistics", "Machine Learning", "SQL"],
-            "growth_potential": "Very High",
-            "avg_salary": "$100,000 - $160,000"
-        },
-        {
-            "id": "career_3",
-            "title": "UX/UI Designer",
-            "category": "Creative",
-            "description": "Create intuitive and beautiful user experiences for digital products.",
-            "skills": ["Design Tools", "User Research", "Prototyping", "Empathy"],
-            "growth_potential": "High",
-            "avg_salary": "$75,000 - $130,000"
-        },
-        {
-            "id": "career_4",
-            "title": "Digital Marketing Manager",
-            "category": "Business",
-            "description": "Plan and execute marketing campaigns across digital channels.",
-            "skills": ["SEO/SEM", "Analytics", "Content Strategy", "Communication"],
-            "growth_potential": "High",
-            "avg_salary": "$70,000 - $120,000"
-        },
-        {
-            "id": "career_5",
-            "title": "Registered Nurse",
-            "category": "Healthcare",
-            "description": "Provide patient care and support in hospitals and healthcare facilities.",
-            "skills": ["Patient Care", "Medical Knowledge", "Communication", "Compassion"],
-            "growth_potential": "Very High",
-            "avg_salary": "$65,000 - $95,000"
-        },
-        {
-            "id": "career_6",
-            "title": "Financial Analyst",
-            "category": "Business",
-            "description": "Analyze financial data to guide business investment decisions.",
-            "skills": ["Excel", "Financial Modeling", "Analysis", "Attention to Detail"],
-            "growth_potential": "High",
-            "avg_salary": "$70,000 - $110,000"
-        },
-        {
-            "id": "career_7",
-            "title": "Content Creator",
-            "category": "Creative",
-            "description": "Create engaging content for social media, blogs, and digital platforms.",
-            "skills": ["Writing", "Video Editing", "Social Media", "Storytelling"],
-            "growth_potential": "Medium",
-            "avg_salary": "$45,000 - $85,000"
-        },
-        {
-            "id": "career_8",
-            "title": "AI/ML Engineer",
-            "category": "Technology",
-            "description": "Build and deploy artificial intelligence and machine learning models.",
-            "skills": ["Python", "TensorFlow", "Deep Learning", "Mathematics"],
-            "growth_potential": "Very High",
-            "avg_salary": "$120,000 - $180,000"
-        }
-    ]
+    if offset < 0 or not 1 <= limit <= CATALOG_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"offset must be >= 0 and limit between 1 and {CATALOG_MAX_PAGE_SIZE}")
+    
+    catalog = await get_career_catalog()
+    etag = catalog.etag(category, skill, growth, q, offset, limit)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
     
-    return {"careers": careers}
+    total, careers = catalog.search(
+        category=category, skill=skill, growth=growth, q=q, offset=offset, limit=limit
+    )
+    return JSONResponse(
+        {"careers": careers, "total": total, "offset": offset, "limit": limit},
+        headers=headers
+    )
 
 @api_router.post("/careers/recommend")
 async def recommend_careers(
@@ -524,8 +738,24 @@ async def recommend_careers(
     request: Request,
     session_token: Optional[str] = Cookie(None)
 ):
-    """Get AI-powered career recommendations based on user profile"""
+    """Get career recommendations based on user profile.
+    
+    Matches come from the local catalog ranker. Pass `explain: true` to have
+    the LLM explain the top matches.
+    """
     user = await get_current_user(request, session_token)
+    try:
+        top_k = min(max(int(profile_data.get("top_k", 5)), 1), 20)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="top_k must be an integer")
+    for field in PROFILE_FIELDS:
+        value = profile_data.get(field, [])
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise HTTPException(status_code=400, detail=f"{field} must be a list of strings")
+    if not isinstance(profile_data.get("experience_level", "beginner"), str):
+        raise HTTPException(status_code=400, detail="experience_level must be a string")
+    if profile_data.get("explain"):
+        await rate_limiter.check("explain", user.user_id)
     
     # Save/update career profile
     profile_id = f"profile_{user.user_id}"
@@ -545,111 +775,192 @@ async def recommend_careers(
         upsert=True
     )
     
-    # Use AI to generate recommendations
-    try:
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY'),
-            session_id=f"recommend_{user.user_id}",
-            system_message="You are a career advisor. Provide 3-5 specific career recommendations based on the user's profile. Format as a JSON array."
-        ).with_model("openai", "gpt-5.2")
-        
-        prompt = f"""Based on this profile, recommend suitable careers:
-        Interests: {', '.join(profile_data.get('interests', []))}
-        Skills: {', '.join(profile_data.get('skills', []))}
-        Experience Level: {profile_data.get('experience_level', 'beginner')}
-        Preferred Industries: {', '.join(profile_data.get('preferred_industries', []))}
-        
-        Provide 3-5 career recommendations with title, why it matches, and key skills needed."""
-        
-        user_msg = UserMessage(text=prompt)
-        ai_response = await chat.send_message(user_msg)
-        
-        return {"recommendations": ai_response, "profile_id": profile_id}
-        
-    except Exception as e:
-        logger.error(f"Career recommendation error: {e}")
-        return {"recommendations": "Unable to generate recommendations at this time.", "profile_id": profile_id}
+    # Rank the catalog locally; the LLM is only asked to explain the shortlist
+    ranker = await get_career_ranker()
+    matches = ranker.rank(profile_doc, k=top_k)
+    
+    recommendations = None
+    if profile_data.get("explain") and matches:
+        try:
+            shortlist = "\n".join(
+                f"- {m['title']} ({', '.join(m.get('skills', [])[:4])})" for m in matches
+            )
+            prompt = f"""Interests: {', '.join(profile_doc['interests'])}
+Skills: {', '.join(profile_doc['skills'])}
+Experience Level: {profile_doc['experience_level']}
+
+Careers:
+{shortlist}"""
+            recommendations = await llm.complete(
+                "explain", prompt, session_id=f"recommend_{user.user_id}", coalesce=True,
+                tier=user.latency_tier
+            )
+        except Overloaded as e:
+            logger.warning(str(e))
+            recommendations = "Unable to generate recommendations at this time."
+        except Exception as e:
+            logger.error(f"Career recommendation error: {e}")
+            recommendations = "Unable to generate recommendations at this time."
+    
+    return {"matches": matches, "recommendations": recommendations, "profile_id": profile_id}
 
 # ==================== ROADMAP ROUTES ====================
 
-@api_router.post("/roadmap/generate")
+async def run_roadmap_job(job: dict, report) -> dict:
+    """Job handler: produce and save one roadmap, reporting each stage"""
+    params = job["params"]
+    career_title = params["career_title"]
+    experience_level = params["experience_level"]
+    cache_key = roadmap_cache_key(career_title, experience_level)
+    
+    await report("checking_cache")
+    cached = None if params.get("regenerate") else await roadmap_cache.get(cache_key)
+    if cached:
+        ai_response = cached["content"]
+    else:
+        await report("generating")
+        ai_response = await _generate_roadmap_content(job["user_id"], career_title, experience_level)
+        await roadmap_cache.put(cache_key, career_title, experience_level, ai_response)
+    
+    # Save roadmap. Content is copied from the shared cache entry (cache_key
+    # records where it came from) so the user's roadmap outlives cache expiry.
+    # The id derives from the job so a retried job cannot save a second copy.
+    await report("saving")
+    roadmap_id = f"roadmap_{job['job_id'].removeprefix('job_')}"
+    roadmap_doc = {
+        "roadmap_id": roadmap_id,
+        "user_id": job["user_id"],
+        "career_title": career_title,
+        "description": f"Learning path for {career_title}",
+        "content": ai_response,
+        "cache_key": cache_key,
+        "experience_level": experience_level,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **derive_roadmap_fields(ai_response)
+    }
+    saved = await db.roadmaps.update_one(
+        {"roadmap_id": roadmap_id}, {"$setOnInsert": roadmap_doc}, upsert=True
+    )
+    if saved.upserted_id is not None:
+        await increment_user_stats(db, job["user_id"], roadmaps=1)
+    
+    return {
+        "roadmap_id": roadmap_id,
+        "step_count": roadmap_doc["step_count"],
+        "total_weeks": roadmap_doc["total_weeks"],
+        "cached": bool(cached)
+    }
+
+roadmap_jobs = JobQueue(
+    db.roadmap_jobs,
+    handlers={"roadmap": run_roadmap_job},
+    workers=int(os.environ.get('ROADMAP_JOB_WORKERS', 4)),
+    failure_message="Roadmap generation failed"
+)
+
+@api_router.post("/roadmap/generate", status_code=202)
 async def generate_roadmap(
     roadmap_request: dict,
     request: Request,
+    response: Response,
     session_token: Optional[str] = Cookie(None)
 ):
-    """Generate personalized learning roadmap for a career"""
+    """Queue generation of a personalized learning roadmap for a career.
+    
+    Returns a job id at once; the job's status, and on success its
+    roadmap_id, are read from /roadmap/jobs/{job_id}.
+    """
     user = await get_current_user(request, session_token)
+    await rate_limiter.check("roadmap", user.user_id)
     
-    career_title = roadmap_request.get("career_title", "")
-    experience_level = roadmap_request.get("experience_level", "beginner")
+    job = await roadmap_jobs.submit("roadmap", user.user_id, {
+        "career_title": roadmap_request.get("career_title", ""),
+        "experience_level": roadmap_request.get("experience_level", "beginner"),
+        "regenerate": bool(roadmap_request.get("regenerate", False))
+    })
+    status_url = f"/api/roadmap/jobs/{job['job_id']}"
+    response.headers["Location"] = status_url
+    return {"job_id": job["job_id"], "status": job["status"], "status_url": status_url}
+
+@api_router.get("/roadmap/jobs/{job_id}")
+async def get_roadmap_job(
+    job_id: str,
+    request: Request,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Job status; with `Accept: text/event-stream`, a `job` event per change until it finishes"""
+    user = await get_current_user(request, session_token)
     
-    # Use AI to generate detailed roadmap
-    try:
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY'),
-            session_id=f"roadmap_{user.user_id}_{uuid.uuid4().hex[:6]}",
-            system_message="""You are a career development expert. Create detailed, actionable learning roadmaps.
-            Format your response as clear steps with this structure:
-            
-            Step 1: [Title]
-            Duration: [X weeks/months]
-            Description of what to learn and do
-            • Key skill 1
-            • Key skill 2
-            • Key skill 3
-            
-            Use this format consistently for all steps. Keep descriptions concise (2-3 sentences max per step)."""
-        ).with_model("openai", "gpt-5.2")
-        
-        prompt = f"""Create a detailed 6-step learning roadmap for becoming a {career_title}.
-        User's current level: {experience_level}
-        
-        For each step provide:
-        1. Clear step title
-        2. Duration estimate
-        3. Brief description (2-3 sentences)
-        4. 3-5 key skills to learn
-        
-        Make it actionable and motivating."""
-        
-        user_msg = UserMessage(text=prompt)
-        ai_response = await chat.send_message(user_msg)
-        
-        # Save roadmap
-        roadmap_id = f"roadmap_{uuid.uuid4().hex[:12]}"
-        roadmap_doc = {
-            "roadmap_id": roadmap_id,
-            "user_id": user.user_id,
-            "career_title": career_title,
-            "description": f"Learning path for {career_title}",
-            "content": ai_response,
-            "experience_level": experience_level,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.roadmaps.insert_one(roadmap_doc)
-        
-        return {"roadmap": ai_response, "roadmap_id": roadmap_id}
+    job = await roadmap_jobs.get(job_id, user.user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if "text/event-stream" in request.headers.get("accept", ""):
+        async def event_stream():
+            async for update in roadmap_jobs.watch(job_id, user.user_id):
+                yield sse_event("job", public_job(update))
+            yield sse_event("done", {"job_id": job_id})
         
-    except Exception as e:
-        logger.error(f"Roadmap generation error: {e}")
-        return {"roadmap": "Unable to generate roadmap at this time.", "roadmap_id": None}
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    return public_job(job)
+
+async def _generate_roadmap_content(user_id: str, career_title: str, experience_level: str) -> str:
+    prompt = f"""Create a detailed 6-step learning roadmap for becoming a {career_title}.
+    User's current level: {experience_level}
+    
+    For each step provide:
+    1. Clear step title
+    2. Duration estimate
+    3. Brief description (2-3 sentences)
+    4. 3-5 key skills to learn
+    
+    Make it actionable and motivating."""
+    
+    return await llm.complete(
+        "roadmap", prompt, session_id=f"roadmap_{user_id}_{uuid.uuid4().hex[:6]}", coalesce=True
+    )
 
 @api_router.get("/roadmap/list")
 async def list_roadmaps(
     request: Request,
     session_token: Optional[str] = Cookie(None)
 ):
-    """Get user's saved roadmaps"""
+    """Get summaries of the user's saved roadmaps (no content)"""
     user = await get_current_user(request, session_token)
     
     roadmaps = await db.roadmaps.find(
         {"user_id": user.user_id},
-        {"_id": 0}
+        SUMMARY_PROJECTION
     ).sort("created_at", -1).to_list(50)
     
     return {"roadmaps": roadmaps}
 
+@api_router.post("/roadmap/batch")
+async def get_roadmaps_batch(
+    batch_request: RoadmapBatchRequest,
+    request: Request,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Get several full roadmaps in one query, in the order requested"""
+    user = await get_current_user(request, session_token)
+    
+    roadmap_ids = list(dict.fromkeys(batch_request.roadmap_ids))
+    found = await db.roadmaps.find(
+        {"roadmap_id": {"$in": roadmap_ids}, "user_id": user.user_id},
+        {"_id": 0}
+    ).to_list(len(roadmap_ids))
+    by_id = {roadmap["roadmap_id"]: roadmap for roadmap in found}
+    
+    return {
+        "roadmaps": [by_id[rid] for rid in roadmap_ids if rid in by_id],
+        "missing": [rid for rid in roadmap_ids if rid not in by_id]
+    }
+
 @api_router.get("/roadmap/{roadmap_id}")
 async def get_roadmap(
     roadmap_id: str,
@@ -679,25 +990,85 @@ async def get_user_profile(
     """Get user profile with stats"""
     user = await get_current_user(request, session_token)
     
-    # Get stats
-    total_chats = await db.chat_messages.count_documents({"user_id": user.user_id, "role": "user"})
-    total_roadmaps = await db.roadmaps.count_documents({"user_id": user.user_id})
-    
-    # Get career profile
-    career_profile = await db.career_profiles.find_one(
-        {"user_id": user.user_id},
-        {"_id": 0}
+    # Counters and career profile are independent reads
+    stats, career_profile = await asyncio.gather(
+        get_user_stats(db, user.user_id),
+        db.career_profiles.find_one({"user_id": user.user_id}, {"_id": 0})
     )
     
     return {
         "user": user.model_dump(),
-        "stats": {
-            "total_chats": total_chats,
-            "total_roadmaps": total_roadmaps
-        },
+        "stats": stats,
         "career_profile": career_profile
     }
 
+# Scrape-time views of counters the components already keep
+registry.callback(
+    "cache_lookups", "Cache lookups by cache and result", ("cache", "result"),
+    lambda: {
+        (name, result): stats[result]
+        for name, stats in (("session", session_cache.stats()), ("roadmap", roadmap_cache.stats()),
+                            ("roadmap_memory", roadmap_cache.stats()["memory"]))
+        for result in ("hits", "misses")
+    },
+    kind="counter"
+)
+registry.callback(
+    "cache_hit_ratio", "Share of cache lookups served from the cache", ("cache",),
+    lambda: {
+        ("session",): session_cache.stats()["hit_ratio"],
+        ("roadmap",): roadmap_cache.stats()["hit_ratio"],
+        ("roadmap_memory",): roadmap_cache.stats()["memory"]["hit_ratio"],
+    }
+)
+registry.callback(
+    "llm_scheduler_waiting", "LLM calls queued for a slot, by scheduling class", ("class",),
+    lambda: {(name,): c["waiting"] for name, c in llm.stats()["scheduler"]["classes"].items()}
+)
+registry.callback(
+    "llm_scheduler_in_flight", "LLM calls holding a slot", (),
+    lambda: {(): llm.scheduler.in_flight}
+)
+registry.callback(
+    "llm_circuit_open", "1 while a provider's LLM circuit breaker is not closed", ("provider",),
+    lambda: {(provider,): 0 if breaker.closed else 1 for provider, breaker in llm.breakers.items()}
+)
+registry.callback(
+    "rate_limit_checks", "Rate limit checks by result", ("result",),
+    lambda: {("allowed",): rate_limiter.allowed, ("denied",): rate_limiter.denied},
+    kind="counter"
+)
+registry.callback(
+    "roadmap_jobs_queued_locally", "Roadmap jobs waiting for a worker in this process", (),
+    lambda: {(): roadmap_jobs.stats()["queued_locally"]}
+)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint for this worker"""
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/system/stats", include_in_schema=False)
+async def get_system_stats():
+    """In-process cache counters for this worker; like /metrics, kept off the public /api router"""
+    return {
+        "session_cache": session_cache.stats(),
+        "roadmap_cache": roadmap_cache.stats(),
+        "llm": llm.stats(),
+        "message_writer": message_writer.stats(),
+        "roadmap_jobs": roadmap_jobs.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "tracing": trace_exporter.stats() if trace_exporter else None
+    }
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -709,6 +1080,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    TracingMiddleware,
+    sample_rate=TRACE_SAMPLE_RATE,
+    exporter=trace_exporter,
+    server_timing=SERVER_TIMING
+)
+
+# Outermost, so the timings include every other middleware
+app.add_middleware(RequestMetricsMiddleware)
+
+@app.on_event("startup")
+async def init_db_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def load_career_catalog():
+    await get_career_ranker()
+
+@app.on_event("startup")
+async def open_http_clients():
+    get_auth_http()
+
+@app.on_event("startup")
+async def recover_roadmap_jobs():
+    await roadmap_jobs.recover()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Hand running jobs back to the queue and flush queued chat messages
+    # before the connection goes away
+    await roadmap_jobs.stop()
+    await message_writer.stop()
+    if trace_exporter is not None:
+        await trace_exporter.stop()
+    if auth_http is not None:
+        await auth_http.aclose()
     client.close()
@@ -0,0 +1,53 @@
+"""Coalesce concurrent identical async calls into one in-flight call."""
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+def fingerprint(*parts: str) -> str:
+    """Stable key for a call made from the given parts (model, prompts, ...)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """While a call for `key` is running, later callers await the same result.
+
+    The shared call runs as its own task and each caller awaits it through
+    `asyncio.shield`, so one caller being cancelled does not cancel the call
+    for the others. Results are not cached once the call completes.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            self.issued += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Mark the exception retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "issued": self.issued,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
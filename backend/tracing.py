@@ -0,0 +1,361 @@
+"""Request-scoped tracing with contextvars.
+
+`TracingMiddleware` starts a `Trace` for every HTTP request and keeps it in
+a contextvar, so `span("name")` anywhere below the handler (including Motor
+executor threads, which copy the context) attaches to the right request.
+Every request gets per-phase totals, which go back to the client as a
+`Server-Timing` header. Only a `sample_rate` share of requests (or those
+arriving with a sampled W3C `traceparent`) also keep individual spans and
+are handed to an exporter, so unsampled requests pay for a couple of
+perf_counter calls and a dict update per span.
+
+Exporters batch finished traces off the request path and write them either
+as JSON lines to a local file or as OTLP/HTTP JSON to a collector such as
+the OpenTelemetry Collector or Jaeger (`http://localhost:4318/v1/traces`).
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import httpx
+from pymongo import monitoring
+
+from metrics import command_collection
+
+logger = logging.getLogger(__name__)
+
+_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_span_id: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    # Non-cryptographic ids are fine here and much cheaper than os.urandom
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def _parse_traceparent(header: Optional[str]):
+    """W3C traceparent -> (trace_id, parent span id, sampled) or None"""
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class Trace:
+    def __init__(self, sampled: bool, trace_id: Optional[str] = None, remote_parent: Optional[str] = None):
+        self.sampled = sampled
+        self.trace_id = trace_id or _new_id(16)
+        self.root_id = _new_id(8)
+        self.remote_parent = remote_parent
+        self.name = "request"
+        self.attributes: Dict[str, object] = {}
+        self.started = time.perf_counter()
+        self.started_ns = time.time_ns()
+        self.ended: Optional[float] = None
+        # Server-Timing key -> [seconds, count]
+        self.timings: Dict[str, list] = {}
+        self.spans: List[dict] = []
+
+    def add(self, name: str, start: float, end: float, timing: str = None, span_id: str = None,
+            parent_id: str = None, attributes: dict = None, error: bool = False):
+        entry = self.timings.get(timing or name)
+        if entry is None:
+            entry = self.timings[timing or name] = [0.0, 0]
+        entry[0] += end - start
+        entry[1] += 1
+        if self.sampled:
+            self.spans.append({
+                "span_id": span_id or _new_id(8),
+                "parent_id": parent_id or self.root_id,
+                "name": name,
+                "start_ns": self._ns(start),
+                "end_ns": self._ns(end),
+                "attributes": attributes or {},
+                "error": error,
+            })
+
+    def _ns(self, t: float) -> int:
+        return self.started_ns + int((t - self.started) * 1e9)
+
+    def server_timing(self) -> str:
+        """Per-phase totals so far, e.g. `auth;dur=1.2, db;desc="3 calls";dur=4.0, app;dur=9.9`"""
+        parts = []
+        for key, (seconds, count) in self.timings.items():
+            desc = f';desc="{count} calls"' if count > 1 else ""
+            parts.append(f"{key}{desc};dur={seconds * 1000:.1f}")
+        parts.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.root_id,
+            "parent_id": self.remote_parent,
+            "name": self.name,
+            "start_ns": self.started_ns,
+            "end_ns": self._ns(self.ended or time.perf_counter()),
+            "attributes": self.attributes,
+            "spans": self.spans,
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+class span:
+    """Time the enclosed block as a phase of the current request (no-op outside one).
+
+    A class rather than a @contextmanager generator to keep the cost of an
+    unsampled span to about a microsecond.
+    """
+
+    __slots__ = ("name", "attributes", "trace", "span_id", "parent_id", "token", "start")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.trace = trace = _trace.get()
+        if trace is not None:
+            self.parent_id = _span_id.get()
+            self.span_id = _new_id(8) if trace.sampled else None
+            self.token = _span_id.set(self.span_id) if self.span_id else None
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self.trace
+        if trace is not None:
+            end = time.perf_counter()
+            if self.token is not None:
+                _span_id.reset(self.token)
+            trace.add(self.name, self.start, end, span_id=self.span_id, parent_id=self.parent_id,
+                      attributes=self.attributes, error=exc_type is not None)
+        return False
+
+
+def record_span(name: str, start: float, end: float, timing: str = None, error: bool = False, **attributes):
+    """Attach an already measured interval (perf_counter times) to the current request.
+
+    For code that cannot wrap a block in `span`, e.g. an async generator
+    that yields between start and end.
+    """
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, start, end, timing=timing, parent_id=_span_id.get(), attributes=attributes, error=error)
+
+
+class MongoCommandTracing(monitoring.CommandListener):
+    """Adds every MongoDB command to the current request's trace (Server-Timing `db`)"""
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+
+    def started(self, event):
+        if _trace.get() is not None:
+            self._collections[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def _record(self, event, error: bool):
+        trace = _trace.get()
+        if trace is None:
+            return
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        end = time.perf_counter()
+        trace.add(f"mongodb.{event.command_name}", end - event.duration_micros / 1e6, end, timing="db",
+                  parent_id=_span_id.get(), attributes={"db.collection": collection}, error=error)
+
+    def succeeded(self, event):
+        self._record(event, False)
+
+    def failed(self, event):
+        self._record(event, True)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a trace per HTTP request.
+
+    The Server-Timing header is written when the response starts, so for
+    streaming responses it covers the work done before the first byte.
+    """
+
+    def __init__(self, app, sample_rate: float = 0.0, exporter=None, server_timing: bool = True):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        parent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                parent = _parse_traceparent(value.decode("latin-1"))
+                break
+        if parent is not None:
+            trace = Trace(parent[2], trace_id=parent[0], remote_parent=parent[1])
+        else:
+            trace = Trace(random.random() < self.sample_rate)
+        token = _trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                trace.attributes["http.status_code"] = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _trace.reset(token)
+            trace.ended = time.perf_counter()
+            route = scope.get("route")
+            trace.name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+            trace.attributes["http.target"] = scope["path"]
+            if trace.sampled and self.exporter is not None:
+                self.exporter.export(trace)
+
+
+class BatchExporter:
+    """Buffers finished traces and writes them in batches from a background task"""
+
+    def __init__(self, flush_interval: float = 2.0, max_buffer: int = 10000):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Trace] = []
+        self._task: Optional[asyncio.Task] = None
+        self.exported = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def export(self, trace: Trace):
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+        self._buffer.append(trace)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            await self._write(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Trace export of {len(batch)} traces failed: {e}")
+
+    async def _write(self, batch: List[Trace]):
+        raise NotImplementedError
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "exporter": type(self).__name__,
+            "buffered": len(self._buffer),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+class JsonlExporter(BatchExporter):
+    """One JSON object per trace, appended to a local file"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    async def _write(self, batch: List[Trace]):
+        lines = "".join(json.dumps(trace.to_dict()) + "\n" for trace in batch)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    out = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            out.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            out.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            out.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            out.append({"key": key, "value": {"stringValue": str(value)}})
+    return out
+
+
+class OtlpExporter(BatchExporter):
+    """POSTs batches as OTLP/HTTP JSON (`/v1/traces`) to a local collector"""
+
+    def __init__(self, endpoint: str, service_name: str = "careerpath-backend", timeout: float = 5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._http = httpx.AsyncClient(timeout=timeout)
+
+    def _spans(self, trace: Trace) -> List[dict]:
+        root = trace.to_dict()
+        spans = [{**root, "kind": 2}] + [{**span, "kind": 1} for span in trace.spans]
+        out = []
+        for span in spans:
+            otlp = {
+                "traceId": trace.trace_id,
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": span["kind"],
+                "startTimeUnixNano": str(span["start_ns"]),
+                "endTimeUnixNano": str(span["end_ns"]),
+                "attributes": _otlp_attributes(span["attributes"]),
+                "status": {"code": 2 if span.get("error") else 0},
+            }
+            if span.get("parent_id"):
+                otlp["parentSpanId"] = span["parent_id"]
+            out.append(otlp)
+        return out
+
+    async def _write(self, batch: List[Trace]):
+        body = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [s for trace in batch for s in self._spans(trace)],
+            }],
+        }]}
+        response = await self._http.post(self.endpoint, json=body)
+        response.raise_for_status()
+
+    async def stop(self):
+        await super().stop()
+        await self._http.aclose()
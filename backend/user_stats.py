@@ -0,0 +1,65 @@
+"""Denormalized per-user activity counters backing the /user/profile stats.
+
+Write paths bump `total_chats` and `total_roadmaps` with `$inc`, so reading
+the stats is a single primary-key lookup instead of counting a user's whole
+chat and roadmap history. `reconcile_user_stats` recounts from the source
+collections to repair drift (failed increments, deleted documents, data
+written before the counters existed).
+"""
+import logging
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ("total_chats", "total_roadmaps")
+
+
+async def increment_user_stats(db, user_id: str, chats: int = 0, roadmaps: int = 0):
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {"$inc": {"total_chats": chats, "total_roadmaps": roadmaps}},
+        upsert=True
+    )
+
+
+async def get_user_stats(db, user_id: str) -> dict:
+    doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0, "user_id": 0}) or {}
+    return {field: doc.get(field, 0) for field in STAT_FIELDS}
+
+
+async def _count_by_user(collection, match: dict) -> dict:
+    pipeline = [{"$match": match}, {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}]
+    return {group["_id"]: group["count"] async for group in collection.aggregate(pipeline, allowDiskUse=True)}
+
+
+async def reconcile_user_stats(db, batch_size: int = 500) -> int:
+    """Reset every user's counters to the true counts; returns documents changed.
+
+    Increments landing while the recount runs can be overwritten, so run it
+    off-peak. Chat messages still buffered by a worker's write-behind queue
+    are not counted until they are flushed.
+    """
+    chats = await _count_by_user(db.chat_messages, {"role": "user"})
+    roadmaps = await _count_by_user(db.roadmaps, {})
+    user_ids = set(chats) | set(roadmaps)
+    async for doc in db.user_stats.find({}, {"_id": 0, "user_id": 1}):
+        user_ids.add(doc["user_id"])
+
+    changed = 0
+    batch = []
+    for user_id in user_ids:
+        batch.append(UpdateOne(
+            {"user_id": user_id},
+            {"$set": {"total_chats": chats.get(user_id, 0), "total_roadmaps": roadmaps.get(user_id, 0)}},
+            upsert=True
+        ))
+        if len(batch) >= batch_size:
+            result = await db.user_stats.bulk_write(batch, ordered=False)
+            changed += result.modified_count + result.upserted_count
+            batch = []
+    if batch:
+        result = await db.user_stats.bulk_write(batch, ordered=False)
+        changed += result.modified_count + result.upserted_count
+    logger.info(f"Reconciled stats for {len(user_ids)} users ({changed} corrected)")
+    return changed
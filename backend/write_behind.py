@@ -0,0 +1,133 @@
+"""Write-behind batching for insert-only collections.
+
+Documents are buffered in memory and written with `insert_many`, either when
+`max_batch` documents are waiting or after `flush_interval` seconds. Until a
+document is written it stays visible through `pending()`, so readers can
+overlay unflushed writes and keep read-your-writes semantics.
+
+This assumes a single server worker. The buffer and the overlay live in
+this process only, so read-your-writes holds only for reads served by the
+worker that took the write. Behind several uvicorn workers without sticky
+routing, a read on another worker can miss a message for up to
+`flush_interval`, or longer while Mongo writes are failing.
+
+Retried batches rely on a unique index on `key_field` so a partially applied
+batch can be replayed: duplicate-key errors count as already written.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindQueue:
+    def __init__(self, collection, key_field: str = "message_id", group_fields: Tuple[str, ...] = (),
+                 max_batch: int = 100, flush_interval: float = 0.05):
+        self.collection = collection
+        self.key_field = key_field
+        self.group_fields = group_fields
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._buffer: List[dict] = []
+        self._pending: Dict[tuple, Dict[str, dict]] = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.batches = 0
+        self.written = 0
+        self.failures = 0
+
+    def enqueue(self, doc: dict):
+        if self._closing:
+            raise RuntimeError("write-behind queue is shut down")
+        self._buffer.append(doc)
+        self._pending.setdefault(self._group(doc), {})[doc[self.key_field]] = doc
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    def pending(self, *group) -> List[dict]:
+        """Unflushed documents for one group (e.g. user_id, conversation_id)"""
+        return list(self._pending.get(tuple(group), {}).values())
+
+    async def flush(self):
+        while self._buffer:
+            batch, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+            try:
+                await self._write(batch)
+            except BaseException:
+                # Put the batch back in front (also on cancellation) so ordering and the
+                # overlay are preserved; replaying it is safe thanks to the unique key
+                self._buffer[:0] = batch
+                raise
+
+    async def stop(self, attempts: int = 3):
+        """Stop the background flusher and write everything still buffered"""
+        self._closing = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for attempt in range(1, attempts + 1):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                logger.error(f"Final flush attempt {attempt} failed: {e}")
+                await asyncio.sleep(0.5 * attempt)
+        logger.error(f"Dropped {len(self._buffer)} unflushed documents on shutdown")
+
+    async def _run(self):
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                backoff = self.flush_interval
+            except Exception as e:
+                self.failures += 1
+                backoff = min(backoff * 2, 5.0)
+                logger.error(f"Write-behind flush failed, retrying in {backoff:.2f}s: {e}")
+            if not self._buffer:
+                # Exit when idle; the next enqueue restarts the flusher
+                return
+
+    async def _write(self, batch: List[dict]):
+        try:
+            # insert_many adds _id to the documents it is given; keep the overlay copies clean
+            await self.collection.insert_many([dict(doc) for doc in batch], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors) or e.details.get("writeConcernErrors"):
+                raise
+        self.batches += 1
+        self.written += len(batch)
+        for doc in batch:
+            group = self._pending.get(self._group(doc))
+            if group is not None:
+                group.pop(doc[self.key_field], None)
+                if not group:
+                    del self._pending[self._group(doc)]
+
+    def _group(self, doc: dict) -> tuple:
+        return tuple(doc.get(field) for field in self.group_fields)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "batches": self.batches,
+            "written": self.written,
+            "failures": self.failures,
+        }
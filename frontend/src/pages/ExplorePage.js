@@ -1,48 +1,65 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useOutletContext, useNavigate } from "react-router-dom";
 import { motion } from "framer-motion";
 import { TrendingUp, DollarSign, Sparkles, ArrowRight, Search } from "lucide-react";
 import { toast } from "sonner";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const PAGE_SIZE = 24;
 
 export default function ExplorePage() {
   const { user } = useOutletContext();
   const navigate = useNavigate();
   const [careers, setCareers] = useState([]);
+  const [total, setTotal] = useState(0);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchQuery, setSearchQuery] = useState("");
+  const [debouncedQuery, setDebouncedQuery] = useState("");
   const [selectedCategory, setSelectedCategory] = useState("All");
+  // Only the newest request may update the list, so a slow earlier search
+  // cannot overwrite the results of a later one
+  const latestRequest = useRef(0);
 
   useEffect(() => {
-    fetchCareers();
-  }, []);
+    const timer = setTimeout(() => setDebouncedQuery(searchQuery.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
-  const fetchCareers = async () => {
+  useEffect(() => {
+    fetchCareers(0);
+  }, [debouncedQuery, selectedCategory]);
+
+  // Filtering and paging happen on the server; `offset` 0 starts a new list
+  const fetchCareers = async (offset) => {
+    const requestId = ++latestRequest.current;
+    const params = new URLSearchParams({ offset, limit: PAGE_SIZE });
+    if (selectedCategory !== "All") params.set("category", selectedCategory);
+    if (debouncedQuery) params.set("q", debouncedQuery);
+    if (offset > 0) setLoadingMore(true);
     try {
-      const response = await fetch(`${BACKEND_URL}/api/careers/explore`, {
+      const response = await fetch(`${BACKEND_URL}/api/careers/explore?${params}`, {
         credentials: 'include'
       });
       if (!response.ok) throw new Error('Failed to fetch careers');
       const data = await response.json();
-      setCareers(data.careers);
+      if (requestId !== latestRequest.current) return;
+      setCareers(previous => offset === 0 ? data.careers : [...previous, ...data.careers]);
+      setTotal(data.total);
     } catch (error) {
+      if (requestId !== latestRequest.current) return;
       console.error('Error fetching careers:', error);
       toast.error('Failed to load careers');
     } finally {
-      setLoading(false);
+      if (requestId === latestRequest.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
 
   const categories = ["All", "Technology", "Business", "Creative", "Healthcare"];
 
-  const filteredCareers = careers.filter(career => {
-    const matchesSearch = career.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                         career.description.toLowerCase().includes(searchQuery.toLowerCase());
-    const matchesCategory = selectedCategory === "All" || career.category === selectedCategory;
-    return matchesSearch && matchesCategory;
-  });
-
   const handleGenerateRoadmap = (career) => {
     navigate('/dashboard/roadmaps/generate', { state: { career } });
   };
@@ -101,12 +118,12 @@ export default function ExplorePage() {
 
         {/* Careers Grid */}
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-          {filteredCareers.map((career, idx) => (
+          {careers.map((career, idx) => (
             <motion.div
               key={career.id}
               initial={{ opacity: 0, y: 20 }}
               animate={{ opacity: 1, y: 0 }}
-              transition={{ duration: 0.3, delay: idx * 0.05 }}
+              transition={{ duration: 0.3, delay: (idx % PAGE_SIZE) * 0.05 }}
               data-testid={`career-card-${career.id}`}
               className="bg-white rounded-3xl p-6 shadow-[0_8px_30px_rgb(0,0,0,0.04)] hover:shadow-[0_20px_50px_rgb(99,102,241,0.15)] transition-all duration-300 hover:-translate-y-1 flex flex-col"
             >
@@ -158,7 +175,20 @@ export default function ExplorePage() {
           ))}
         </div>
 
-        {filteredCareers.length === 0 && (
+        {careers.length < total && (
+          <div className="text-center mt-8">
+            <button
+              data-testid="load-more-careers"
+              onClick={() => fetchCareers(careers.length)}
+              disabled={loadingMore}
+              className="px-6 py-3 bg-white text-zinc-700 border border-zinc-200 rounded-xl font-medium hover:border-indigo-300 transition-all duration-200 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : `Show more (${total - careers.length} remaining)`}
+            </button>
+          </div>
+        )}
+
+        {careers.length === 0 && (
           <div className="text-center py-16">
             <p className="text-zinc-500 text-lg">No careers found matching your criteria</p>
           </div>
@@ -1,29 +1,47 @@
-import { useState, useEffect } from "react";
-import { useOutletContext, useNavigate, useLocation } from "react-router-dom";
+import { useState, useEffect, useRef } from "react";
+import { useOutletContext, useNavigate, useLocation, useParams } from "react-router-dom";
 import { motion } from "framer-motion";
 import { Map, Calendar, ArrowLeft, Loader2, Sparkles } from "lucide-react";
 import { toast } from "sonner";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
+const JOB_STAGE_MESSAGES = {
+  queued: 'Waiting for a free slot...',
+  checking_cache: 'Looking for a matching roadmap...',
+  generating: 'Our AI mentor is creating a personalized learning path just for you...',
+  saving: 'Saving your roadmap...'
+};
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
 
 export default function RoadmapsPage() {
   const { user } = useOutletContext();
   const navigate = useNavigate();
   const location = useLocation();
+  const { roadmapId } = useParams();
   const [roadmaps, setRoadmaps] = useState([]);
   const [loading, setLoading] = useState(true);
   const [generating, setGenerating] = useState(false);
   const [generatedRoadmap, setGeneratedRoadmap] = useState(null);
+  const [jobStage, setJobStage] = useState('queued');
+  const mounted = useRef(true);
+
+  useEffect(() => () => { mounted.current = false; }, []);
 
   const careerFromState = location.state?.career;
 
   useEffect(() => {
     if (careerFromState && location.pathname.includes('generate')) {
       generateRoadmap(careerFromState.title);
+    } else if (roadmapId) {
+      fetchRoadmap(roadmapId);
     } else {
       fetchRoadmaps();
     }
-  }, [careerFromState]);
+  }, [careerFromState, roadmapId]);
 
   const fetchRoadmaps = async () => {
     try {
@@ -41,8 +59,53 @@ export default function RoadmapsPage() {
     }
   };
 
+  // The list only carries summaries; full content is loaded when a roadmap is opened
+  const fetchRoadmap = async (id) => {
+    setLoading(true);
+    try {
+      const response = await fetch(`${BACKEND_URL}/api/roadmap/${id}`, {
+        credentials: 'include'
+      });
+      if (!response.ok) throw new Error('Failed to fetch roadmap');
+      const data = await response.json();
+      setGeneratedRoadmap({
+        title: data.career_title,
+        content: data.content,
+        id: data.roadmap_id,
+        steps: data.steps,
+        totalWeeks: data.total_weeks
+      });
+      return true;
+    } catch (error) {
+      console.error('Error fetching roadmap:', error);
+      toast.error('Failed to load roadmap');
+      navigate('/dashboard/roadmaps', { replace: true });
+      return false;
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  // Generation runs as a background job; poll it until it finishes
+  const waitForJob = async (jobId) => {
+    const deadline = Date.now() + JOB_TIMEOUT_MS;
+    while (mounted.current && Date.now() < deadline) {
+      const response = await fetch(`${BACKEND_URL}/api/roadmap/jobs/${jobId}`, {
+        credentials: 'include'
+      });
+      if (!response.ok) throw new Error('Failed to fetch roadmap job');
+      const job = await response.json();
+      if (job.status === 'succeeded') return job;
+      if (job.status === 'failed') throw new Error(job.error || 'Roadmap generation failed');
+      setJobStage(job.stage);
+      await sleep(JOB_POLL_INTERVAL_MS);
+    }
+    throw new Error('Roadmap generation timed out');
+  };
+
   const generateRoadmap = async (careerTitle) => {
     setGenerating(true);
+    setJobStage('queued');
     try {
       const response = await fetch(`${BACKEND_URL}/api/roadmap/generate`, {
         method: 'POST',
@@ -55,9 +118,12 @@ export default function RoadmapsPage() {
       });
 
       if (!response.ok) throw new Error('Failed to generate roadmap');
-      const data = await response.json();
-      setGeneratedRoadmap({ title: careerTitle, content: data.roadmap, id: data.roadmap_id });
-      toast.success('Roadmap generated successfully!');
+      const { job_id } = await response.json();
+      const job = await waitForJob(job_id);
+      if (!mounted.current) return;
+      if (await fetchRoadmap(job.result.roadmap_id)) {
+        toast.success('Roadmap generated successfully!');
+      }
     } catch (error) {
       console.error('Error generating roadmap:', error);
       toast.error('Failed to generate roadmap');
@@ -75,13 +141,21 @@ export default function RoadmapsPage() {
             <Loader2 className="w-8 h-8 text-indigo-600 animate-spin" />
           </div>
           <h2 className="text-2xl font-semibold text-zinc-900 mb-2">Generating Your Roadmap</h2>
-          <p className="text-zinc-500">Our AI mentor is creating a personalized learning path just for you...</p>
+          <p className="text-zinc-500">{JOB_STAGE_MESSAGES[jobStage] || JOB_STAGE_MESSAGES.generating}</p>
         </div>
       </div>
     );
   }
 
-  // Parse roadmap content into steps
+  // Steps parsed by the server when the roadmap was saved
+  const toViewSteps = (steps) => steps.map(step => ({
+    title: step.title,
+    description: step.description ? [step.description] : [],
+    duration: step.duration || '',
+    skills: step.skills || []
+  }));
+
+  // Fallback for roadmaps the server could not structure
   const parseRoadmapSteps = (content) => {
     if (!content) return [];
     
@@ -134,7 +208,9 @@ export default function RoadmapsPage() {
   };
 
   if (generatedRoadmap) {
-    const steps = parseRoadmapSteps(generatedRoadmap.content);
+    const steps = generatedRoadmap.steps?.length
+      ? toViewSteps(generatedRoadmap.steps)
+      : parseRoadmapSteps(generatedRoadmap.content);
     
     return (
       <div data-testid="roadmap-view" className="min-h-screen p-8">
@@ -164,7 +240,10 @@ export default function RoadmapsPage() {
               </div>
               <div className="flex-1">
                 <h1 className="text-3xl font-semibold text-zinc-900 mb-2">{generatedRoadmap.title}</h1>
-                <p className="text-zinc-500">Your personalized learning roadmap</p>
+                <p className="text-zinc-500">
+                  Your personalized learning roadmap
+                  {generatedRoadmap.totalWeeks ? ` · about ${Math.round(generatedRoadmap.totalWeeks)} weeks` : ''}
+                </p>
               </div>
               <div className="text-right">
                 <p className="text-sm text-zinc-500">Total Phases</p>
@@ -308,6 +387,7 @@ export default function RoadmapsPage() {
                 <div className="flex items-center gap-2 text-sm text-zinc-500">
                   <Calendar className="w-4 h-4" />
                   <span>Created {new Date(roadmap.created_at).toLocaleDateString()}</span>
+                  {roadmap.step_count > 0 && <span className="ml-auto">{roadmap.step_count} phases</span>}
                 </div>
               </motion.div>
             ))}
@@ -5,6 +5,7 @@ Simple API Tests for AI Career Mentor
 import requests
 import json
 import sys
+import time
 from datetime import datetime
 
 BACKEND_URL = "https://mentor-chat-hub.preview.emergentagent.com"
@@ -50,6 +51,19 @@ def test_api(name, method, endpoint, expected_status=200, data=None):
         print(f"❌ {name} - Error: {e}")
         return False, {}
 
+def wait_for_job(job_id, timeout=180, interval=2):
+    """Poll a roadmap job until it leaves queued/running; None on timeout or error"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        success, job = test_api("Roadmap Job Status", "GET", f"roadmap/jobs/{job_id}")
+        if not success:
+            return None
+        if job.get('status') not in ('queued', 'running'):
+            return job
+        time.sleep(interval)
+    print(f"❌ Roadmap job {job_id} still running after {timeout}s")
+    return None
+
 def main():
     print("🚀 AI Career Mentor API Quick Test")
     print(f"Backend URL: {BACKEND_URL}")
@@ -94,13 +108,14 @@ def main():
     
     # Test 5: Roadmap Generation
     total_tests += 1
-    success, roadmap = test_api(
-        "Generate Roadmap", "POST", "roadmap/generate",
+    success, roadmap_job = test_api(
+        "Generate Roadmap", "POST", "roadmap/generate", expected_status=202,
         data={"career_title": "Software Engineer", "experience_level": "beginner"}
     )
-    if success:
+    job = wait_for_job(roadmap_job['job_id']) if success else None
+    if job and job.get('status') == 'succeeded':
         tests_passed += 1
-        roadmap_id = roadmap.get('roadmap_id')
+        roadmap_id = job['result']['roadmap_id']
         print(f"🗺️ Roadmap Generated: {roadmap_id}")
         
         # Test 6: List Roadmaps
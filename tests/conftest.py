@@ -0,0 +1,83 @@
+"""Shared fixtures. Tests run fully offline: the fake LLM answers every
+route, MongoDB is replaced by mongomock-motor and the auth provider by a
+local stand-in server (see test_auth_session.py)."""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import mongomock_motor
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_FIRST_TOKEN_DELAY"] = "0"
+os.environ["FAKE_LLM_CHUNK_DELAY"] = "0"
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    # One event loop for the whole run: server.py's queues and background
+    # tasks are module globals bound to the loop that first uses them
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def _shared_event_loop(anyio_backend):
+    # anyio keeps its test runner (and loop) alive while a fixture holds it
+    yield
+
+
+@pytest.fixture
+def mongo_db():
+    return mongomock_motor.AsyncMongoMockClient()["test_database"]
+
+
+@pytest.fixture(scope="session")
+def server_module():
+    """server.py bound to an in-memory database"""
+    import motor.motor_asyncio
+    original = motor.motor_asyncio.AsyncIOMotorClient
+    motor.motor_asyncio.AsyncIOMotorClient = lambda *a, **kw: mongomock_motor.AsyncMongoMockClient()
+    try:
+        import server
+    finally:
+        motor.motor_asyncio.AsyncIOMotorClient = original
+    return server
+
+
+@pytest.fixture
+async def app_client(server_module):
+    """httpx client for the app over a fresh database"""
+    import httpx
+    from db_maintenance import ensure_indexes
+
+    for name in await server_module.db.list_collection_names():
+        await server_module.db.drop_collection(name)
+    await ensure_indexes(server_module.db)
+    server_module.session_cache.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server_module.app),
+                                 base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def seed_user(server_module, app_client):
+    """Insert a user with a live session; returns the Authorization headers"""
+    async def seed(user_id: str = "user_test1", token: str = "token_test1", **fields) -> dict:
+        now = datetime.now(timezone.utc)
+        await server_module.db.users.insert_one({
+            "user_id": user_id, "email": f"{user_id}@example.com", "name": "Test User",
+            "created_at": now.isoformat(), **fields
+        })
+        await server_module.db.user_sessions.insert_one({
+            "user_id": user_id, "session_token": token,
+            "expires_at": now + timedelta(days=1), "created_at": now
+        })
+        return {"Authorization": f"Bearer {token}"}
+    return seed
@@ -0,0 +1,149 @@
+"""/auth/session against a local stand-in for the Emergent auth provider"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+pytestmark = pytest.mark.anyio
+
+SESSIONS = {
+    "sid-alice": {"email": "alice@example.com", "name": "Alice", "picture": "https://example.com/a.png",
+                  "session_token": "token-alice-1"},
+    "sid-alice-again": {"email": "alice@example.com", "name": "Alice B.", "picture": None,
+                        "session_token": "token-alice-2"},
+}
+
+
+class AuthProviderHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("X-Session-ID"))
+        data = SESSIONS.get(self.headers.get("X-Session-ID"))
+        body = json.dumps(data if data else {"detail": "invalid session"}).encode()
+        self.send_response(200 if data else 401)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def auth_provider():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), AuthProviderHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def auth_url(server_module, auth_provider, monkeypatch):
+    monkeypatch.setattr(server_module, "AUTH_SESSION_URL",
+                        f"http://127.0.0.1:{auth_provider.server_port}/session-data")
+    auth_provider.requests.clear()
+    return auth_provider
+
+
+class RecordingCollection:
+    """Records the methods called on a collection; can raise on the first calls of one"""
+
+    def __init__(self, collection, fail: dict = None):
+        self._collection = collection
+        self.calls = []
+        self.fail = dict(fail or {})
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            if self.fail.get(name):
+                self.fail[name] -= 1
+                raise DuplicateKeyError("E11000 duplicate key error collection: users index: email_1")
+            return attr(*args, **kwargs)
+        return call
+
+
+class Database:
+    def __init__(self, db, **collections):
+        self._db = db
+        self._collections = collections
+
+    def __getattr__(self, name):
+        return self._collections.get(name) or getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self._collections.get(name) or self._db[name]
+
+
+async def login(app_client, session_id):
+    return await app_client.post("/api/auth/session", json={"session_id": session_id})
+
+
+async def test_login_creates_then_updates_user_in_one_round_trip(server_module, app_client, auth_url, monkeypatch):
+    users = RecordingCollection(server_module.db.users)
+    monkeypatch.setattr(server_module, "db", Database(server_module.db, users=users))
+
+    first = await login(app_client, "sid-alice")
+    assert first.status_code == 200, first.text
+    user = first.json()["user"]
+    assert user["email"] == "alice@example.com" and user["user_id"].startswith("user_")
+    assert users.calls == ["find_one_and_update"]
+
+    users.calls.clear()
+    second = await login(app_client, "sid-alice-again")
+    assert second.status_code == 200, second.text
+    assert users.calls == ["find_one_and_update"]
+    assert second.json()["user"]["user_id"] == user["user_id"]
+    assert second.json()["user"]["name"] == "Alice B."
+    assert await server_module.db.users.count_documents({"email": "alice@example.com"}) == 1
+    assert auth_url.requests == ["sid-alice", "sid-alice-again"]
+
+
+async def test_upsert_retries_after_concurrent_insert(server_module, app_client, auth_url, monkeypatch):
+    users = RecordingCollection(server_module.db.users, fail={"find_one_and_update": 1})
+    monkeypatch.setattr(server_module, "db", Database(server_module.db, users=users))
+
+    response = await login(app_client, "sid-alice")
+    assert response.status_code == 200, response.text
+    assert users.calls == ["find_one_and_update", "find_one_and_update"]
+    assert response.json()["user"]["email"] == "alice@example.com"
+
+
+async def test_second_duplicate_key_error_is_not_retried_again(server_module, app_client, auth_url, monkeypatch):
+    users = RecordingCollection(server_module.db.users, fail={"find_one_and_update": 2})
+    monkeypatch.setattr(server_module, "db", Database(server_module.db, users=users))
+
+    response = await login(app_client, "sid-alice")
+    assert response.status_code == 500
+    assert users.calls == ["find_one_and_update", "find_one_and_update"]
+
+
+async def test_invalid_session_id_is_rejected(server_module, app_client, auth_url):
+    response = await login(app_client, "sid-unknown")
+    assert response.status_code == 401
+    assert auth_url.requests == ["sid-unknown"]
+    assert await server_module.db.users.count_documents({}) == 0
+    assert await server_module.db.user_sessions.count_documents({}) == 0
+
+
+async def test_login_primes_the_session_cache(server_module, app_client, auth_url):
+    response = await login(app_client, "sid-alice")
+    assert response.status_code == 200, response.text
+    token = response.json()["session_token"]
+    cached_user, expires_at = server_module.session_cache.get(token)
+    assert cached_user.email == "alice@example.com"
+
+    # Served from the cache: the session document is not read again
+    await server_module.db.user_sessions.delete_many({})
+    me = await app_client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json()["user_id"] == cached_user.user_id
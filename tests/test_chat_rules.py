@@ -0,0 +1,45 @@
+"""Chat follow-up rules: both keyword strategies pick the same follow-ups"""
+import pytest
+
+from chat_rules import REGEX_MIN_KEYWORDS, ChatRuleEngine, KeywordMatcher
+
+STRATEGIES = {"rule_by_rule": float("inf"), "regex": 0}
+
+
+@pytest.fixture(params=list(STRATEGIES))
+def engine(request):
+    return ChatRuleEngine.from_file(regex_min_keywords=STRATEGIES[request.param])
+
+
+def test_shipped_rules_use_rule_by_rule_checks():
+    engine = ChatRuleEngine.from_file()
+    assert engine.matcher is None
+    keywords = {w for rule in engine.mcq_rules + engine.suggestion_rules for w in rule.keywords}
+    assert len(keywords) < REGEX_MIN_KEYWORDS
+
+
+@pytest.mark.parametrize("message, user_turns, message_count, question, first_option", [
+    ("hi", 1, 1, "What areas interest you the most?", None),
+    ("I like DATA science", 3, 5, "What's your current experience level?", None),
+    ("I like music", 3, 5, None, None),
+    ("I like painting", 3, 5, "What's your current experience level?", None),  # substring "ai"
+    ("what roadmap should I follow", 6, 11, "How much time can you dedicate to learning per week?", None),
+    ("I want to Learn", 2, 3, "Which skills would you like to focus on?", None),
+    ("What should I do for a job?", 0, 1, None, "Tell me about tech careers"),
+    ("how do I study", 0, 2, None, "Create a learning roadmap"),
+    ("show me the steps", 0, 1, None, "Generate a detailed roadmap"),
+    ("hello there", 0, 1, None, "Explore career options"),
+    ("what job?", 0, 3, None, None),  # past the suggestion window
+])
+def test_select(engine, message, user_turns, message_count, question, first_option):
+    mcq, suggestions = engine.select(message, user_turns, message_count)
+    assert (mcq["question"] if mcq else None) == question
+    assert (suggestions[0] if suggestions else None) == first_option
+
+
+def test_regex_matcher_finds_overlapping_and_prefix_keywords():
+    matcher = KeywordMatcher({
+        "ai": frozenset({"short"}), "air": frozenset({"long"}), "rate": frozenset({"other"}),
+    })
+    assert matcher.match("AIRATE") == {"short", "long", "other"}
+    assert matcher.match("nothing here") == frozenset()
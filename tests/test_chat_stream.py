@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+from starlette.requests import Request
+
+pytestmark = pytest.mark.anyio
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def history(app_client, headers, conversation_id):
+    response = await app_client.get("/api/chat/history", params={"conversation_id": conversation_id},
+                                    headers=headers)
+    assert response.status_code == 200
+    return response.json()["messages"]
+
+
+async def test_stream_emits_tokens_then_done(app_client, seed_user):
+    headers = await seed_user()
+    response = await app_client.post("/api/chat/stream", json={"message": "how do I get into data science?"},
+                                     headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "start" and names[-1] == "done"
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) > 1, "the fake LLM streams word by word"
+    assert "".join(tokens).startswith("[fake:")
+
+    done = events[-1][1]
+    messages = await history(app_client, headers, done["conversation_id"])
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[-1]["message_id"] == done["message_id"]
+    assert messages[-1]["content"] == "".join(tokens)
+
+
+def stream_request(token: str) -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/chat/stream", "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+
+
+async def test_disconnect_mid_stream_still_records_the_turn(server_module, app_client, seed_user, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_CHUNK_DELAY", "0.01")
+    headers = await seed_user()
+    response = await server_module.stream_chat_message(
+        server_module.ChatRequest(message="tell me about nursing", conversation_id="conv_disconnect"),
+        stream_request("token_test1"), None
+    )
+    received = []
+    first_token = asyncio.Event()
+
+    async def consume():
+        async for event in response.body_iterator:
+            received.append(event)
+            if event.startswith("event: token"):
+                first_token.set()
+
+    task = asyncio.ensure_future(consume())
+    await asyncio.wait_for(first_token.wait(), timeout=5)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0.05)  # let the shielded write finish
+
+    assert any(event.startswith("event: token") for event in received)
+    assert not any(event.startswith("event: done") for event in received)
+    messages = await history(app_client, headers, "conv_disconnect")
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[-1]["content"].startswith("[fake:")  # the partial reply
+    conversation = await server_module.db.conversations.find_one({"conversation_id": "conv_disconnect"})
+    assert conversation["message_count"] == 2
+
+
+async def test_stream_closed_before_any_token_stores_fallback(server_module, app_client, seed_user):
+    headers = await seed_user()
+    response = await server_module.stream_chat_message(
+        server_module.ChatRequest(message="hello", conversation_id="conv_closed"),
+        stream_request("token_test1"), None
+    )
+    iterator = response.body_iterator
+    assert (await iterator.__anext__()).startswith("event: start")
+    await iterator.aclose()
+
+    messages = await history(app_client, headers, "conv_closed")
+    assert messages[-1]["role"] == "assistant"
+    assert messages[-1]["content"] == server_module.CHAT_FALLBACK_RESPONSE
@@ -0,0 +1,44 @@
+"""Conversation summaries and the rolling prompt summary stored beside them"""
+import pytest
+
+from chat_context import ContextBuilder
+from conversations import list_conversations, record_conversation_turn
+
+pytestmark = pytest.mark.anyio
+
+
+def message(i: int, role: str = "user") -> dict:
+    return {
+        "message_id": f"msg_{i:03d}", "user_id": "u1", "conversation_id": "c1", "role": role,
+        "content": f"Message number {i} about career planning. " * 10,
+        "timestamp": f"2026-01-01T00:{i:02d}:00+00:00",
+    }
+
+
+async def seed_messages(db, count: int = 12):
+    await db.chat_messages.insert_many([message(i, "user" if i % 2 == 0 else "assistant") for i in range(count)])
+
+
+async def test_summary_fields_are_not_listed(mongo_db):
+    await seed_messages(mongo_db)
+    await record_conversation_turn(mongo_db, "u1", "c1", message(11, "assistant"), messages=12, user_turns=6)
+    context = await ContextBuilder(token_budget=400, summary_tokens=100).build(mongo_db, "u1", "c1", "next?")
+    assert context.summary_tokens > 0
+
+    stored = await mongo_db.conversations.find_one({"conversation_id": "c1"})
+    assert stored["summary"] and stored["summary_until"]
+    [listed] = await list_conversations(mongo_db, "u1")
+    assert "summary" not in listed and "summary_until" not in listed
+    assert listed["created_at"] == message(11)["timestamp"]
+    assert listed["message_count"] == 12
+
+
+async def test_context_builder_does_not_create_the_conversation(mongo_db):
+    await seed_messages(mongo_db)
+    await ContextBuilder(token_budget=400, summary_tokens=100).build(mongo_db, "u1", "c1", "next?")
+    assert await mongo_db.conversations.count_documents({}) == 0
+
+    # The first recorded turn creates the document, created_at included
+    await record_conversation_turn(mongo_db, "u1", "c1", message(12))
+    stored = await mongo_db.conversations.find_one({"conversation_id": "c1"}, {"_id": 0})
+    assert stored["created_at"] == message(12)["timestamp"]
@@ -0,0 +1,34 @@
+"""/careers/explore conditional requests"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", W/"abc" ,"y"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ('"xabc"', False),
+    ('"abc', False),
+    ("", False),
+])
+def test_etag_matches(server_module, header, matches):
+    assert server_module.etag_matches(header, '"abc"') is matches
+
+
+async def test_explore_not_modified_only_on_exact_etag(app_client, seed_user):
+    headers = await seed_user()
+    first = await app_client.get("/api/careers/explore", params={"limit": 5}, headers=headers)
+    etag = first.headers["etag"]
+
+    again = await app_client.get("/api/careers/explore", params={"limit": 5},
+                                 headers={**headers, "If-None-Match": f'"other", {etag}'})
+    assert again.status_code == 304
+    # A longer tag that merely contains ours is a different tag
+    longer = etag[:-1] + 'ff"'
+    again = await app_client.get("/api/careers/explore", params={"limit": 5},
+                                 headers={**headers, "If-None-Match": longer})
+    assert again.status_code == 200
+    assert again.json() == first.json()
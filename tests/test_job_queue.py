@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from job_queue import JobQueue, public_job
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyCollection:
+    """Wraps a collection so the next `failures` update_one calls raise"""
+
+    def __init__(self, collection, failures: int):
+        self._collection = collection
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def update_one(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("mongo blip")
+        return await self._collection.update_one(*args, **kwargs)
+
+
+async def wait_for_status(queue, job_id, statuses, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await queue.get(job_id, "u1")
+        if job["status"] in statuses:
+            return job
+        assert asyncio.get_running_loop().time() < deadline, job
+        await asyncio.sleep(0.01)
+
+
+async def test_worker_survives_failed_outcome_write(mongo_db):
+    async def handler(job, report):
+        return {"ok": True}
+
+    collection = FlakyCollection(mongo_db.jobs, failures=0)
+    queue = JobQueue(collection, {"echo": handler}, workers=1)
+    try:
+        collection.failures = 1
+        first = await queue.submit("echo", "u1", {})
+        await asyncio.sleep(0.05)
+        # The outcome write failed: the job is left running for lease recovery
+        assert (await queue.get(first["job_id"], "u1"))["status"] == "running"
+
+        second = await queue.submit("echo", "u1", {})
+        job = await wait_for_status(queue, second["job_id"], ("succeeded",))
+        assert job["result"] == {"ok": True}
+    finally:
+        await queue.stop()
+
+
+async def test_failed_progress_report_does_not_fail_the_job(mongo_db):
+    async def handler(job, report):
+        await report("working")
+        return {"ok": True}
+
+    collection = FlakyCollection(mongo_db.jobs, failures=0)
+    queue = JobQueue(collection, {"echo": handler}, workers=1)
+    try:
+        collection.failures = 1
+        job = await queue.submit("echo", "u1", {})
+        assert (await wait_for_status(queue, job["job_id"], ("succeeded", "failed")))["status"] == "succeeded"
+    finally:
+        await queue.stop()
+
+
+async def test_failed_job_exposes_only_the_generic_message(mongo_db, caplog):
+    async def handler(job, report):
+        raise RuntimeError("pymongo: connection to db-internal-7:27017 refused")
+
+    queue = JobQueue(mongo_db.jobs, {"boom": handler}, workers=1, failure_message="Roadmap generation failed")
+    try:
+        job = await queue.submit("boom", "u1", {})
+        job = await wait_for_status(queue, job["job_id"], ("failed",))
+        assert job["error"] == "Roadmap generation failed"
+        assert "db-internal-7" not in str(public_job(job))
+        assert "db-internal-7" in caplog.text
+    finally:
+        await queue.stop()
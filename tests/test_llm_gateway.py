@@ -0,0 +1,153 @@
+"""Deadlines, circuit breaking and hedging in LlmGateway, with scripted
+providers and the fault-injecting fake LLM"""
+import asyncio
+import time
+
+import pytest
+
+import fake_llm
+from circuit_breaker import CircuitOpen
+from llm_gateway import HEDGE_MIN_SAMPLES, LlmGateway, LlmTimeout
+from llm_providers import FakeProvider, Route
+
+pytestmark = pytest.mark.anyio
+
+
+class Message:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ScriptedChat:
+    def __init__(self, action, route: Route):
+        self.action = action
+        self.route = route
+
+    async def send_message(self, message) -> str:
+        action = self.action
+        if action == "error":
+            raise RuntimeError("provider error")
+        if action == "hang":
+            await asyncio.Event().wait()
+        if isinstance(action, (int, float)):
+            await asyncio.sleep(action)
+        return f"{self.route}: {message.text}"
+
+
+class ScriptedProvider:
+    """Each new chat takes the next scripted action: 'ok', 'error', 'hang' or a delay in seconds"""
+
+    def __init__(self, *actions, default="ok"):
+        self.actions = list(actions)
+        self.default = default
+        self.routes = []
+
+    def new_chat(self, route: Route, session_id: str, system_message: str):
+        self.routes.append(route)
+        action = self.actions.pop(0) if self.actions else self.default
+        return ScriptedChat(action, route), Message
+
+
+def gateway(provider, **kwargs) -> LlmGateway:
+    return LlmGateway(providers={"openai": provider}, **kwargs)
+
+
+async def test_breaker_opens_half_opens_and_closes():
+    provider = ScriptedProvider(default="error")
+    llm = gateway(provider, breaker_options={"min_calls": 4, "open_seconds": 0.05})
+    breaker = lambda: llm.breakers["openai"]  # noqa: E731
+
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            await llm.complete("mentor", "hi", session_id="s")
+    assert breaker().state == "open"
+
+    # Refused without reaching the provider
+    calls = len(provider.routes)
+    with pytest.raises(CircuitOpen):
+        await llm.complete("mentor", "hi", session_id="s")
+    assert len(provider.routes) == calls
+
+    # After open_seconds one probe goes through; its failure reopens the breaker
+    await asyncio.sleep(0.06)
+    with pytest.raises(RuntimeError):
+        await llm.complete("mentor", "hi", session_id="s")
+    assert breaker().state == "open"
+    assert breaker().opened == 2
+
+    # A successful probe closes it again
+    provider.default = "ok"
+    await asyncio.sleep(0.06)
+    assert await llm.complete("mentor", "hi", session_id="s") == "openai/gpt-5.2: hi"
+    assert breaker().state == "closed"
+    assert llm.scheduler.in_flight == 0
+
+
+async def test_injected_fake_llm_errors_open_the_breaker(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "1")
+    llm = LlmGateway(providers={"openai": FakeProvider()}, breaker_options={"min_calls": 3})
+    for _ in range(3):
+        with pytest.raises(fake_llm.FakeLlmError):
+            await llm.complete("mentor", "hi", session_id="s")
+    with pytest.raises(CircuitOpen):
+        await llm.complete("mentor", "hi", session_id="s")
+    assert llm.stats()["breakers"]["openai"]["rejected"] == 1
+
+
+async def test_budget_overrun_raises_llm_timeout():
+    llm = gateway(ScriptedProvider(default="hang"), budgets={"mentor": 0.05})
+    started = time.monotonic()
+    with pytest.raises(LlmTimeout):
+        await llm.complete("mentor", "hi", session_id="s")
+    assert time.monotonic() - started < 0.5
+    assert llm.timeouts == 1
+    assert llm.scheduler.in_flight == 0
+
+
+async def test_stream_budget_overrun_raises_llm_timeout(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_SLOW_RATE", "1")
+    monkeypatch.setenv("FAKE_LLM_SLOW_DELAY", "5")
+    llm = LlmGateway(providers={"openai": FakeProvider()}, budgets={"mentor": 0.05})
+    with pytest.raises(LlmTimeout):
+        async for _ in llm.stream("mentor", "hi", session_id="s"):
+            pass
+    assert llm.timeouts == 1
+    assert llm.scheduler.in_flight == 0
+
+
+async def warm_up(llm, count=HEDGE_MIN_SAMPLES):
+    for _ in range(count):
+        await llm.complete("mentor", "warm", session_id="s")
+
+
+async def test_hedge_wins_when_first_attempt_is_slow():
+    provider = ScriptedProvider(default=0.001)
+    llm = gateway(provider, hedge_prompts=("mentor",))
+    await warm_up(llm)
+
+    provider.actions = ["hang", 0.001]
+    started = time.monotonic()
+    assert await llm.complete("mentor", "hi", session_id="s") == "openai/gpt-5.2: hi"
+    assert time.monotonic() - started < 0.5
+    assert (llm.hedges, llm.hedge_wins) == (1, 1)
+    await asyncio.sleep(0.01)  # let the cancelled first attempt release its slot
+    assert llm.scheduler.in_flight == 0
+
+
+async def test_cancelled_caller_cancels_the_pending_first_attempt():
+    provider = ScriptedProvider(default=0.001)
+    llm = gateway(provider, hedge_prompts=("mentor",))
+    await warm_up(llm)
+
+    # The slow first attempt is still inside the hedge delay when the caller goes away
+    llm.latency["mentor"].samples.extend([10_000.0] * 100)
+    provider.actions = ["hang"]
+    caller = asyncio.ensure_future(llm.complete("mentor", "hi", session_id="s"))
+    await asyncio.sleep(0.02)
+    assert llm.scheduler.in_flight == 1
+    caller.cancel()
+    await asyncio.gather(caller, return_exceptions=True)
+    await asyncio.sleep(0.01)
+    assert llm.scheduler.in_flight == 0
+    assert llm.hedges == 0
+
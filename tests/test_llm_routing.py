@@ -0,0 +1,64 @@
+"""The routing table and the gateway sending each call to its routed provider"""
+import pytest
+
+from llm_gateway import LlmGateway
+from llm_providers import DEFAULT_ROUTES_PATH, ModelRouter, Route
+from tests.test_llm_gateway import ScriptedProvider
+
+pytestmark = pytest.mark.anyio
+
+
+ROUTES = {
+    "default": {"provider": "openai", "model": "big"},
+    "rules": [
+        {"name": "blurbs", "when": {"prompt": ["explain"]}, "route": {"provider": "openai", "model": "small"}},
+        {"name": "fast_short_chat", "when": {"prompt": ["mentor"], "tier": ["fast"], "max_chars": 100},
+         "route": {"provider": "openai", "model": "small"}},
+        {"name": "bulk", "when": {"class": ["bulk"], "min_chars": 10},
+         "route": {"provider": "anthropic", "model": "long"}},
+    ],
+}
+
+
+def test_router_picks_first_matching_rule():
+    router = ModelRouter(ROUTES)
+    assert router.route("explain", "recommend", "x" * 5000) == Route("openai", "small")
+    assert router.route("mentor", "interactive", "short", tier="fast") == Route("openai", "small")
+    assert router.route("mentor", "interactive", "x" * 101, tier="fast") == Route("openai", "big")
+    assert router.route("mentor", "interactive", "short") == Route("openai", "big")
+    assert router.route("roadmap", "bulk", "x" * 10) == Route("anthropic", "long")
+    assert router.route("roadmap", "bulk", "x" * 9) == Route("openai", "big")
+    stats = router.stats()
+    assert stats["default"] == {"route": "openai/big", "calls": 3}
+    assert stats["blurbs"]["calls"] == stats["fast_short_chat"]["calls"] == stats["bulk"]["calls"] == 1
+
+
+def test_shipped_routing_table_loads():
+    router = ModelRouter.from_file(DEFAULT_ROUTES_PATH)
+    assert router.route("roadmap", "bulk", "x") == router.default
+    assert router.route("explain", "recommend", "x") != router.default
+
+
+async def test_gateway_sends_each_call_to_its_routed_provider():
+    openai, anthropic = ScriptedProvider(), ScriptedProvider(default="error")
+    llm = LlmGateway(router=ModelRouter(ROUTES), providers={"openai": openai, "anthropic": anthropic},
+                     breaker_options={"min_calls": 2})
+
+    assert await llm.complete("explain", "why", session_id="s") == "openai/small: why"
+    assert await llm.complete("mentor", "hi", session_id="s", tier="fast") == "openai/small: hi"
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await llm.complete("roadmap", "a long roadmap prompt", session_id="s")
+    assert anthropic.routes == [Route("anthropic", "long")] * 2
+
+    # Only the failing provider's breaker opens
+    assert llm.breakers["anthropic"].state == "open"
+    assert llm.breakers["openai"].state == "closed"
+    assert await llm.complete("mentor", "hi", session_id="s") == "openai/big: hi"
+
+
+async def test_unknown_provider_is_an_error():
+    llm = LlmGateway(router=ModelRouter.single("mistral", "x"), providers={"openai": ScriptedProvider()})
+    with pytest.raises(ValueError):
+        await llm.complete("mentor", "hi", session_id="s")
+    assert llm.scheduler.in_flight == 0
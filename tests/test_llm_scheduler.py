@@ -0,0 +1,103 @@
+"""Priority admission, shedding and wait metrics in PriorityScheduler"""
+import asyncio
+
+import pytest
+
+from llm_scheduler import Overloaded, PriorityClass, PriorityScheduler, llm_scheduler_wait_seconds
+from metrics import registry
+
+pytestmark = pytest.mark.anyio
+
+CLASSES = {
+    "interactive": PriorityClass(priority=0, max_wait=5, max_queue=10),
+    "bulk": PriorityClass(priority=2, max_wait=5, max_queue=10),
+}
+
+
+async def test_higher_priority_waiter_is_admitted_first():
+    scheduler = PriorityScheduler(1, CLASSES)
+    await scheduler.acquire("bulk")
+    admitted = []
+
+    async def call(class_name):
+        await scheduler.acquire(class_name)
+        admitted.append(class_name)
+
+    # Bulk work queued first, interactive chat arrives later
+    waiters = [asyncio.ensure_future(call("bulk")), asyncio.ensure_future(call("bulk"))]
+    await asyncio.sleep(0)
+    waiters.append(asyncio.ensure_future(call("interactive")))
+    await asyncio.sleep(0)
+    assert scheduler.waiting == 3
+
+    for _ in range(3):
+        scheduler.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*waiters)
+    assert admitted == ["interactive", "bulk", "bulk"]
+    assert scheduler.in_flight == 1
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+async def test_waiter_past_its_deadline_is_shed_not_run():
+    scheduler = PriorityScheduler(1, CLASSES)
+    await scheduler.acquire("interactive")
+    with pytest.raises(Overloaded) as shed:
+        await scheduler.acquire("bulk", max_wait=0.02)
+    assert shed.value.reason.startswith("waited")
+    stats = scheduler.stats()["classes"]["bulk"]
+    assert (stats["expired"], stats["waiting"], stats["admitted"]) == (1, 0, 0)
+
+    # The freed slot skips the expired waiter's tombstone instead of handing it over
+    scheduler.release()
+    assert scheduler.in_flight == 0
+    assert scheduler.stats()["classes"]["bulk"]["admitted"] == 0
+
+
+async def test_call_is_shed_on_arrival_when_expected_wait_exceeds_deadline():
+    scheduler = PriorityScheduler(1, CLASSES)
+    for _ in range(10):
+        scheduler.service.record(2000)
+    await scheduler.acquire("interactive")
+    with pytest.raises(Overloaded) as shed:
+        await scheduler.acquire("bulk", max_wait=1)
+    assert shed.value.reason.startswith("expected wait")
+    assert scheduler.waiting == 0
+    scheduler.release()
+
+
+async def test_queue_full_sheds_on_arrival():
+    scheduler = PriorityScheduler(1, {"bulk": PriorityClass(priority=2, max_wait=5, max_queue=1)})
+    await scheduler.acquire("bulk")
+    waiter = asyncio.ensure_future(scheduler.acquire("bulk"))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as shed:
+        await scheduler.acquire("bulk")
+    assert shed.value.reason == "queue full"
+    scheduler.release()
+    await waiter
+    scheduler.release()
+
+
+def wait_count(class_name: str, priority: str) -> float:
+    return {
+        (name, tuple(sorted(labels.items()))): value for name, labels, value in llm_scheduler_wait_seconds.samples()
+    }.get(("llm_scheduler_wait_seconds_count", (("class", class_name), ("priority", priority))), 0)
+
+
+async def test_admission_wait_is_exported():
+    scheduler = PriorityScheduler(1, CLASSES)
+    before = wait_count("bulk", "2")
+    await scheduler.acquire("interactive")
+    waiter = asyncio.ensure_future(scheduler.acquire("bulk"))
+    await asyncio.sleep(0.02)
+    scheduler.release()
+    await waiter
+    scheduler.release()
+
+    assert wait_count("bulk", "2") == before + 1
+    assert scheduler.stats()["classes"]["bulk"]["wait_p50_ms"] >= 15
+    rendered = registry.render()
+    assert "# TYPE llm_scheduler_wait_seconds histogram" in rendered
+    assert 'llm_scheduler_wait_seconds_bucket{class="bulk",priority="2",le="0.01"}' in rendered
@@ -0,0 +1,85 @@
+"""Keyset pagination over (timestamp, message_id)"""
+import pytest
+
+from pagination import (InvalidCursor, decode_cursor, encode_cursor, in_range, keyset_filter,
+                        merge_messages)
+
+pytestmark = pytest.mark.anyio
+
+# Several messages share a timestamp, so only the message_id breaks the tie
+TIMESTAMPS = ["2026-01-01T00:00:00+00:00"] * 3 + ["2026-01-01T00:00:01+00:00"] * 4 + ["2026-01-01T00:00:02+00:00"]
+
+
+def messages() -> list:
+    return [
+        {"message_id": f"msg_{i:02d}", "user_id": "u1", "conversation_id": "c1", "timestamp": ts}
+        for i, ts in enumerate(TIMESTAMPS)
+    ]
+
+
+def test_cursor_round_trip():
+    doc = messages()[4]
+    cursor = encode_cursor(doc)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (doc["timestamp"], doc["message_id"])
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", encode_cursor({"timestamp": 5, "message_id": "m"}),
+                                    "WzEsMiwzXQ"])  # [1,2,3]
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+async def page_through(collection, size: int, backwards: bool = False) -> list:
+    pages, cursor = [], None
+    order = -1 if backwards else 1
+    while True:
+        query = {"conversation_id": "c1", **keyset_filter(**{"before" if backwards else "after": cursor})}
+        page = await collection.find(query, {"_id": 0}).sort(
+            [("timestamp", order), ("message_id", order)]
+        ).limit(size).to_list(size)
+        if not page:
+            return pages
+        pages.append([m["message_id"] for m in page])
+        cursor = encode_cursor(page[-1])
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5])
+async def test_pages_cover_ties_exactly_once(mongo_db, size):
+    await mongo_db.chat_messages.insert_many(messages())
+    expected = [m["message_id"] for m in messages()]
+
+    forward = await page_through(mongo_db.chat_messages, size)
+    assert [m for page in forward for m in page] == expected
+    backward = await page_through(mongo_db.chat_messages, size, backwards=True)
+    assert [m for page in backward for m in page] == expected[::-1]
+
+
+def test_in_range_matches_keyset_filter_on_ties():
+    docs = messages()
+    after, before = encode_cursor(docs[1]), encode_cursor(docs[5])
+    assert [d["message_id"] for d in docs if in_range(d, after=after, before=before)] == [
+        "msg_02", "msg_03", "msg_04"
+    ]
+    assert keyset_filter() == {}
+    assert "$and" in keyset_filter(after=after, before=before)
+
+
+async def test_in_range_agrees_with_mongo(mongo_db):
+    docs = messages()
+    await mongo_db.chat_messages.insert_many([dict(d) for d in docs])
+    for cursor_doc in docs:
+        for side in ("after", "before"):
+            cursor = {side: encode_cursor(cursor_doc)}
+            stored = await mongo_db.chat_messages.find(keyset_filter(**cursor), {"_id": 0}).to_list(None)
+            assert sorted(m["message_id"] for m in stored) == [
+                d["message_id"] for d in docs if in_range(d, **cursor)
+            ]
+
+
+def test_merge_orders_and_deduplicates():
+    docs = messages()
+    stored, pending = docs[:5], docs[3:]
+    assert merge_messages(stored, pending) == docs
+    assert merge_messages(stored, pending, descending=True) == docs[::-1]
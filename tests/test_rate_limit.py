@@ -0,0 +1,65 @@
+"""Token buckets and RATE_LIMITS parsing"""
+import pytest
+
+from rate_limit import Limit, MemoryBuckets, RateLimiter, RateLimitExceeded, parse_limits
+
+pytestmark = pytest.mark.anyio
+
+LIMIT = Limit(capacity=3, period=30)  # one token every 10 seconds
+
+
+def test_full_bucket_then_retry_after():
+    buckets = MemoryBuckets()
+    assert [buckets.take_now("chat", "u1", LIMIT, 100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take_now("chat", "u1", LIMIT, 100.0) == pytest.approx(10.0)
+    # Four seconds later 0.4 of a token has come back
+    assert buckets.take_now("chat", "u1", LIMIT, 104.0) == pytest.approx(6.0)
+
+
+def test_refill_is_continuous_and_capped():
+    buckets = MemoryBuckets()
+    for _ in range(3):
+        buckets.take_now("chat", "u1", LIMIT, 0.0)
+    assert buckets.take_now("chat", "u1", LIMIT, 10.0) == 0.0  # exactly one token refilled
+    assert buckets.take_now("chat", "u1", LIMIT, 10.0) > 0
+    # A long idle period refills to capacity, not beyond
+    assert [buckets.take_now("chat", "u1", LIMIT, 1000.0) for _ in range(4)][-1] == pytest.approx(10.0)
+
+
+def test_buckets_are_per_key_and_per_limit():
+    buckets = MemoryBuckets()
+    for _ in range(3):
+        buckets.take_now("chat", "u1", LIMIT, 0.0)
+    assert buckets.take_now("chat", "u1", LIMIT, 0.0) > 0
+    assert buckets.take_now("chat", "u2", LIMIT, 0.0) == 0.0
+    assert buckets.take_now("roadmap", "u1", LIMIT, 0.0) == 0.0
+
+
+def test_idle_full_buckets_are_pruned():
+    buckets = MemoryBuckets(max_keys=2)
+    buckets.take_now("chat", "u1", LIMIT, 0.0)
+    buckets.take_now("chat", "u2", LIMIT, 25.0)
+    buckets.take_now("chat", "u3", LIMIT, 40.0)  # u1 has been idle for a full period
+    assert set(buckets._buckets) == {("chat", "u2"), ("chat", "u3")}
+
+
+async def test_limiter_raises_with_retry_after():
+    limiter = RateLimiter({"chat": Limit(1, 60)})
+    await limiter.check("chat", "u1")
+    await limiter.check("unlimited", "u1")
+    with pytest.raises(RateLimitExceeded) as exceeded:
+        await limiter.check("chat", "u1")
+    assert 59 < exceeded.value.retry_after <= 60
+    assert (limiter.allowed, limiter.denied) == (1, 1)
+
+
+def test_parse_limits():
+    assert parse_limits("chat=20/60, roadmap = 5/600,") == {"chat": Limit(20, 60), "roadmap": Limit(5, 600)}
+    assert parse_limits("") == {}
+
+
+@pytest.mark.parametrize("spec", ["chat=20", "chat", "chat=/60", "chat=a/b", "=5/60", "chat=0/60",
+                                  "chat=5/0", "chat=-1/60", "chat=nan/60", "chat=5/inf"])
+def test_parse_limits_skips_malformed_items(spec, caplog):
+    assert parse_limits(f"{spec},explain=10/300") == {"explain": Limit(10, 300)}
+    assert "Ignoring malformed rate limit" in caplog.text
@@ -0,0 +1,61 @@
+"""/careers/recommend input validation"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("top_k", [None, "many", [3], {"k": 3}])
+async def test_non_integer_top_k_is_rejected(app_client, seed_user, top_k):
+    headers = await seed_user()
+    response = await app_client.post("/api/careers/recommend", json={"skills": ["python"], "top_k": top_k},
+                                     headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "top_k must be an integer"
+
+
+async def test_infinite_top_k_is_rejected(app_client, seed_user):
+    headers = await seed_user()
+    response = await app_client.post("/api/careers/recommend", content='{"top_k": Infinity}',
+                                     headers={**headers, "Content-Type": "application/json"})
+    assert response.status_code == 400
+
+
+async def test_top_k_is_clamped(app_client, seed_user):
+    headers = await seed_user()
+    response = await app_client.post("/api/careers/recommend", json={"skills": ["python"], "top_k": "2"},
+                                     headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["matches"]) == 2
+    response = await app_client.post("/api/careers/recommend", json={"skills": ["python"], "top_k": 0},
+                                     headers=headers)
+    assert len(response.json()["matches"]) == 1
+
+
+@pytest.mark.parametrize("field, value", [
+    ("interests", "technology"),
+    ("skills", 42),
+    ("skills", {"python": True}),
+    ("preferred_industries", ["technology", 3]),
+    ("interests", None),
+])
+async def test_profile_fields_must_be_lists_of_strings(app_client, seed_user, server_module, field, value):
+    headers = await seed_user()
+    response = await app_client.post("/api/careers/recommend", json={field: value}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"{field} must be a list of strings"
+    # Rejected before the profile is saved
+    assert await server_module.db.career_profiles.count_documents({}) == 0
+
+
+async def test_experience_level_must_be_a_string(app_client, seed_user):
+    headers = await seed_user()
+    response = await app_client.post("/api/careers/recommend", json={"experience_level": ["senior"]},
+                                     headers=headers)
+    assert response.status_code == 400
+
+
+async def test_ranker_ignores_malformed_stored_profiles(server_module):
+    ranker = await server_module.get_career_ranker()
+    listed = ranker.rank({"skills": ["python"]})
+    assert ranker.rank({"skills": "python"}) == listed  # one phrase, not six letters
+    assert ranker.rank({"skills": 42, "interests": {"a": 1}}) == []
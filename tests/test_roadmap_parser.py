@@ -0,0 +1,106 @@
+"""Parsing LLM roadmap text into steps"""
+import pytest
+
+from roadmap_parser import RoadmapParseError, parse_duration_weeks, parse_roadmap, structure_roadmap
+
+NUMBERED = """Great choice! Here's a beginner roadmap for becoming a UX Designer.
+
+Step 1: Design Fundamentals
+Duration: 4-6 weeks
+Learn the principles of visual design, typography and colour theory.
+• Visual hierarchy
+• Typography basics
+
+Step 2: User Research
+Duration: 1-2 months
+Practice interviews and usability testing with real users.
+• Interview techniques
+• Affinity mapping
+
+Step 3: Portfolio
+Build three case studies over the next 8 weeks and publish them.
+"""
+
+MARKDOWN_NUMBERED = """## Roadmap: Cloud Engineer
+
+1. **Linux and networking**
+   Timeframe: 3 weeks
+   - Shell scripting
+   - TCP/IP, DNS
+2. **A major cloud provider**
+   Timeframe: 2 months
+   - AWS core services
+"""
+
+BULLETED = """Here is your roadmap to become a Data Analyst:
+
+- **Step 1: Spreadsheet and statistics basics** (2-3 weeks)
+  - Excel / Google Sheets
+  - Descriptive statistics
+- **Step 2: SQL** (1 month)
+  - SELECT, JOIN, GROUP BY
+* **Phase 3: Dashboards**
+  Duration: 2 weeks
+"""
+
+FREE_TEXT = """Becoming a nurse usually starts with a degree in nursing, followed by the
+licensing exam. Along the way, look for volunteering at a local clinic and
+talk to practising nurses about which specialty suits you.
+- Anatomy
+- Patient communication
+"""
+
+
+def test_numbered_steps():
+    roadmap = parse_roadmap(NUMBERED)
+    assert [s.title for s in roadmap.steps] == ["Design Fundamentals", "User Research", "Portfolio"]
+    first, second, third = roadmap.steps
+    assert (first.duration, first.duration_weeks) == ("4-6 weeks", 6.0)
+    assert first.skills == ["Visual hierarchy", "Typography basics"]
+    assert first.description.startswith("Learn the principles")
+    assert (second.duration, second.duration_weeks) == ("1-2 months", 8.7)
+    # No Duration line: taken from the description
+    assert (third.duration, third.duration_weeks) == ("8 weeks", 8.0)
+    assert roadmap.total_weeks == 22.7
+
+
+def test_markdown_numbered_steps():
+    roadmap = parse_roadmap(MARKDOWN_NUMBERED)
+    assert [s.title for s in roadmap.steps] == ["Linux and networking", "A major cloud provider"]
+    assert roadmap.steps[0].skills == ["Shell scripting", "TCP/IP, DNS"]
+    assert [s.duration_weeks for s in roadmap.steps] == [3.0, 8.7]
+
+
+def test_bulleted_steps():
+    roadmap = parse_roadmap(BULLETED)
+    assert [s.title for s in roadmap.steps] == [
+        "Spreadsheet and statistics basics (2-3 weeks)", "SQL (1 month)", "Dashboards"
+    ]
+    assert roadmap.steps[0].skills == ["Excel / Google Sheets", "Descriptive statistics"]
+    assert [s.duration for s in roadmap.steps] == ["2-3 weeks", "1 month", "2 weeks"]
+    assert roadmap.total_weeks == 9.3
+
+
+def test_free_text_falls_back_to_unparsed():
+    with pytest.raises(RoadmapParseError):
+        parse_roadmap(FREE_TEXT)
+    assert structure_roadmap(FREE_TEXT) == {"steps": [], "total_weeks": None, "parse_status": "unparsed"}
+    assert structure_roadmap("")["parse_status"] == "unparsed"
+
+
+def test_structure_roadmap_stores_plain_dicts():
+    fields = structure_roadmap(NUMBERED)
+    assert fields["parse_status"] == "parsed"
+    assert fields["steps"][1] == {
+        "title": "User Research", "duration": "1-2 months", "duration_weeks": 8.7,
+        "description": "Practice interviews and usability testing with real users.",
+        "skills": ["Interview techniques", "Affinity mapping"],
+    }
+
+
+@pytest.mark.parametrize("text, weeks", [
+    ("6 weeks", 6.0), ("10 days", 1.4), ("1-2 months", 8.7), ("3 to 4 weeks", 4.0),
+    ("1 year", 52.0), ("about 1.5 months", 6.5), ("a while", None), (None, None),
+])
+def test_parse_duration_weeks(text, weeks):
+    assert parse_duration_weeks(text) == weeks
@@ -0,0 +1,17 @@
+"""Operational endpoints live beside /metrics, not on the public /api router"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_system_stats_is_not_under_api(app_client):
+    assert (await app_client.get("/api/system/stats")).status_code == 404
+
+
+async def test_system_stats_and_metrics(app_client):
+    response = await app_client.get("/system/stats")
+    assert response.status_code == 200
+    assert {"session_cache", "llm", "message_writer", "roadmap_jobs"} <= set(response.json())
+    response = await app_client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
@@ -0,0 +1,134 @@
+"""WriteBehindQueue: the unflushed overlay and batch retries"""
+import asyncio
+import json
+
+import pytest
+
+from write_behind import WriteBehindQueue
+
+pytestmark = pytest.mark.anyio
+
+
+def chat_message(i: int, user_id: str = "u1", conversation_id: str = "c1") -> dict:
+    return {
+        "message_id": f"msg_{i:03d}", "user_id": user_id, "conversation_id": conversation_id,
+        "role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}",
+        "timestamp": f"2026-01-01T00:00:{i:02d}+00:00",
+    }
+
+
+class FailingInserts:
+    """Wraps a collection so the next `failures` insert_many calls raise"""
+
+    def __init__(self, collection, failures: int):
+        self._collection = collection
+        self.failures = failures
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def insert_many(self, docs, **kwargs):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("mongo unavailable")
+        return await self._collection.insert_many(docs, **kwargs)
+
+
+async def wait_until(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def test_pending_overlay_until_flushed(mongo_db):
+    queue = WriteBehindQueue(mongo_db.chat_messages, group_fields=("user_id", "conversation_id"),
+                             flush_interval=60)
+    first = chat_message(0)
+    queue.enqueue(first)
+    queue.enqueue(chat_message(1))
+    queue.enqueue(chat_message(2, conversation_id="c2"))
+    assert [m["message_id"] for m in queue.pending("u1", "c1")] == ["msg_000", "msg_001"]
+    assert await mongo_db.chat_messages.count_documents({}) == 0
+
+    await queue.stop()
+    assert queue.pending("u1", "c1") == queue.pending("u1", "c2") == []
+    assert await mongo_db.chat_messages.count_documents({}) == 3
+    assert "_id" not in first  # the overlay copy is not touched by insert_many
+
+
+async def test_failed_batch_is_retried_not_dropped(mongo_db):
+    collection = FailingInserts(mongo_db.chat_messages, failures=2)
+    queue = WriteBehindQueue(collection, group_fields=("user_id", "conversation_id"), flush_interval=0.01)
+    for i in range(3):
+        queue.enqueue(chat_message(i))
+
+    await wait_until(lambda: queue.written == 3)
+    assert queue.failures == 2
+    assert collection.calls == 3
+    assert queue.pending("u1", "c1") == []
+    stored = await mongo_db.chat_messages.find({}, {"_id": 0}).sort("message_id", 1).to_list(None)
+    assert [m["message_id"] for m in stored] == ["msg_000", "msg_001", "msg_002"]
+    await queue.stop()
+
+
+async def test_failed_batch_stays_visible_while_retrying(mongo_db):
+    collection = FailingInserts(mongo_db.chat_messages, failures=1)
+    queue = WriteBehindQueue(collection, group_fields=("user_id", "conversation_id"), flush_interval=60)
+    queue.enqueue(chat_message(0))
+    with pytest.raises(RuntimeError):
+        await queue.flush()
+    # Put back in front of the buffer: still overlaid and replayed by the next flush
+    assert [m["message_id"] for m in queue.pending("u1", "c1")] == ["msg_000"]
+    await queue.flush()
+    assert queue.pending("u1", "c1") == []
+    assert await mongo_db.chat_messages.count_documents({}) == 1
+    await queue.stop()
+
+
+async def test_replayed_partial_batch_counts_duplicates_as_written(mongo_db):
+    await mongo_db.chat_messages.create_index("message_id", unique=True)
+    await mongo_db.chat_messages.insert_one(chat_message(0))  # applied before the batch failed
+    queue = WriteBehindQueue(mongo_db.chat_messages, group_fields=("user_id", "conversation_id"),
+                             flush_interval=60)
+    queue.enqueue(chat_message(0))
+    queue.enqueue(chat_message(1))
+    await queue.flush()
+    assert queue.pending("u1", "c1") == []
+    assert await mongo_db.chat_messages.count_documents({}) == 2
+    await queue.stop()
+
+
+@pytest.fixture
+async def held_writer(server_module, app_client, monkeypatch):
+    """Swap in a message writer that never flushes on its own"""
+    queue = WriteBehindQueue(server_module.db.chat_messages, group_fields=("user_id", "conversation_id"),
+                             flush_interval=60)
+    monkeypatch.setattr(server_module, "message_writer", queue)
+    yield queue
+    await queue.stop()
+
+
+async def test_history_merges_unflushed_messages(server_module, app_client, seed_user, held_writer):
+    headers = await seed_user()
+    await server_module.db.chat_messages.insert_many([chat_message(i, "user_test1") for i in range(2)])
+    for i in range(2, 4):
+        held_writer.enqueue(chat_message(i, "user_test1"))
+
+    response = await app_client.get("/api/chat/history", params={"conversation_id": "c1"}, headers=headers)
+    assert [m["message_id"] for m in response.json()["messages"]] == [f"msg_{i:03d}" for i in range(4)]
+    assert await server_module.db.chat_messages.count_documents({"conversation_id": "c1"}) == 2
+
+    # Paging backwards from the newest unflushed message
+    response = await app_client.get("/api/chat/history", headers=headers, params={
+        "conversation_id": "c1", "limit": 2, "before": response.json()["cursors"]["after"]
+    })
+    assert [m["message_id"] for m in response.json()["messages"]] == ["msg_001", "msg_002"]
+
+    response = await app_client.get("/api/chat/history", params={"conversation_id": "c1"},
+                                    headers={**headers, "Accept": "application/x-ndjson"})
+    assert [json.loads(line)["message_id"] for line in response.text.splitlines()] == [
+        f"msg_{i:03d}" for i in range(4)
+    ]